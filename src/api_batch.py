@@ -0,0 +1,204 @@
+# api_batch.py
+"""
+批量任务工具模块
+通过 Batch 接口异步提交大量非交互请求（成本更低、使用独立的限流配额）
+
+注意：需要服务端支持 OpenAI 兼容的 /v1/files 与 /v1/batches 接口
+"""
+
+import hashlib
+import time
+from pathlib import Path
+
+from openai import OpenAI
+
+from api_utils import MODEL_NAME, ApiJob, _build_messages, json_dumps, json_loads
+
+
+# ============ 配置常量 ============
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+DEFAULT_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INTERVAL = 5.0       # 首次轮询间隔（秒）
+BATCH_MAX_POLL_INTERVAL = 30.0  # 最大轮询间隔（秒）
+BATCH_FAILED_STATUSES = ("failed", "expired", "cancelled")
+
+
+def _custom_id(index: int) -> str:
+    """任务序号对应的 custom_id"""
+    return f"job-{index}"
+
+
+def submit_batch(
+    client: OpenAI,
+    jobs: list[ApiJob],
+    completion_window: str = DEFAULT_COMPLETION_WINDOW,
+) -> str:
+    """
+    上传任务文件并创建批量任务
+
+    参数:
+        client: OpenAI 客户端实例
+        jobs: 任务列表，每项为 (system_prompt, user_content)
+        completion_window: 完成时限
+
+    返回:
+        批量任务 ID
+    """
+    lines = []
+    for i, (system_prompt, user_content) in enumerate(jobs):
+        record = {
+            "custom_id": _custom_id(i),
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": MODEL_NAME,
+                "messages": _build_messages(system_prompt, user_content),
+            },
+        }
+        lines.append(json_dumps(record))
+    payload = b"\n".join(lines) + b"\n"
+
+    input_file = client.files.create(file=("batch_input.jsonl", payload), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=completion_window,
+    )
+    return batch.id
+
+
+def wait_for_batch(client: OpenAI, batch_id: str) -> dict[str, str]:
+    """
+    轮询批量任务直到完成，并下载解析结果
+
+    参数:
+        client: OpenAI 客户端实例
+        batch_id: 批量任务 ID
+
+    返回:
+        {custom_id: 返回文本}；单个请求失败的任务不包含在内
+
+    异常:
+        RuntimeError: 批量任务失败、过期或被取消
+    """
+    poll_interval = BATCH_POLL_INTERVAL
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            break
+        if batch.status in BATCH_FAILED_STATUSES:
+            raise RuntimeError(f"批量任务 {batch_id} 未完成，状态: {batch.status}")
+        print(f"  批量任务状态: {batch.status}，{poll_interval:.0f}秒后再次查询...")
+        time.sleep(poll_interval)
+        poll_interval = min(poll_interval * 1.5, BATCH_MAX_POLL_INTERVAL)
+
+    results: dict[str, str] = {}
+    if not batch.output_file_id:
+        return results
+
+    content = client.files.content(batch.output_file_id).read()
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        record = json_loads(line)
+        response = record.get("response")
+        if not response or response.get("status_code") != 200:
+            continue
+        results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return results
+
+
+def run_batch_jobs(
+    client: OpenAI,
+    jobs: list[ApiJob],
+    completion_window: str = DEFAULT_COMPLETION_WINDOW,
+) -> list[str | BaseException]:
+    """
+    提交批量任务并阻塞等待结果
+
+    参数:
+        client: OpenAI 客户端实例
+        jobs: 任务列表，每项为 (system_prompt, user_content)
+        completion_window: 完成时限
+
+    返回:
+        与 jobs 顺序一致的结果列表；失败的任务对应位置为异常对象
+    """
+    if not jobs:
+        return []
+
+    batch_id = submit_batch(client, jobs, completion_window)
+    print(f"  已提交批量任务: {batch_id}（共 {len(jobs)} 个请求）")
+    return collect_batch_results(client, batch_id, len(jobs))
+
+
+def run_resumable_batch_jobs(
+    client: OpenAI,
+    jobs: list[ApiJob],
+    state_path: str | Path,
+    completion_window: str = DEFAULT_COMPLETION_WINDOW,
+) -> list[str | BaseException]:
+    """
+    提交批量任务并等待结果，批量任务 ID 保存到状态文件以便中断后继续等待
+
+    状态文件记录批量任务 ID 和任务内容的摘要；再次运行时任务内容相同则不再重新提交，
+    直接等待原批量任务（等待可能长达 completion_window）。批量任务失败、过期或被取消时
+    删除状态文件，下次运行重新提交。任务结果全部写出后由调用方删除状态文件
+
+    参数:
+        client: OpenAI 客户端实例
+        jobs: 任务列表，每项为 (system_prompt, user_content)
+        state_path: 状态文件路径
+        completion_window: 完成时限
+
+    返回:
+        与 jobs 顺序一致的结果列表；失败的任务对应位置为异常对象
+    """
+    if not jobs:
+        return []
+
+    state_path = Path(state_path)
+    jobs_digest = hashlib.blake2b(json_dumps(jobs), digest_size=16).hexdigest()
+
+    batch_id = None
+    try:
+        state = json_loads(state_path.read_bytes())
+        if state.get("jobs_digest") == jobs_digest:
+            batch_id = state["batch_id"]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    if batch_id is not None:
+        print(f"  继续等待已提交的批量任务: {batch_id}（共 {len(jobs)} 个请求）")
+    else:
+        batch_id = submit_batch(client, jobs, completion_window)
+        state_path.write_bytes(json_dumps({"batch_id": batch_id, "jobs_digest": jobs_digest}))
+        print(f"  已提交批量任务: {batch_id}（共 {len(jobs)} 个请求）")
+
+    try:
+        return collect_batch_results(client, batch_id, len(jobs))
+    except RuntimeError:
+        state_path.unlink(missing_ok=True)
+        raise
+
+
+def collect_batch_results(client: OpenAI, batch_id: str, count: int) -> list[str | BaseException]:
+    """
+    等待批量任务完成，并按任务顺序整理结果
+
+    参数:
+        client: OpenAI 客户端实例
+        batch_id: 批量任务 ID
+        count: 任务数
+
+    返回:
+        按任务顺序排列的结果列表；失败的任务对应位置为异常对象
+    """
+    outputs = wait_for_batch(client, batch_id)
+
+    results: list[str | BaseException] = []
+    for i in range(count):
+        text = outputs.get(_custom_id(i))
+        results.append(text if text is not None else RuntimeError(f"批量任务中请求 {i + 1} 失败"))
+    return results
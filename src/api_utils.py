@@ -1,24 +1,116 @@
 # api_utils.py
 """
 API 调用工具模块
-提供与 DeepSeek API 交互的公共函数
+提供与 DeepSeek API 交互的公共函数（同步与异步）
 """
 
+import asyncio
+import atexit
+import hashlib
+import json
+import random
+import sqlite3
+import threading
 import time
-from openai import OpenAI
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from pathlib import Path
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+
+# 可选依赖：orjson 可明显加快批量请求中的 JSON 编解码，未安装时使用标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# ============ 类型定义 ============
+
+ApiJob = tuple[str, str]  # (system_prompt, user_content)
 
 
 # ============ 配置常量 ============
 
 MODEL_NAME = "deepseek-chat"
+MODEL_CONTEXT_TOKENS = 64_000  # 模型上下文窗口（token），保守取值
 API_BASE_URL = "https://api.deepseek.com"
 DEFAULT_MAX_RETRIES = 3
 DEFAULT_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+DEFAULT_CONCURRENCY = 16
+DEFAULT_WORKERS = 16
+SYSTEM_MESSAGE_CACHE_SIZE = 32
+
+# 可重试的错误类型（限流、网络、超时、服务端 5xx），其余错误直接抛出
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+# 携带 Retry-After 时触发全局冷却的 HTTP 状态码
+COOLDOWN_STATUS_CODES = (429, 503)
+
+# 响应缓存配置（重复处理未修改的片段时直接返回缓存结果）
+RESPONSE_CACHE_DIR = Path.home() / ".cache" / "streamscribe"
+RESPONSE_CACHE_TTL = 30 * 86400  # 30 天
+
+# 多片段合并请求时附加到系统提示词后的输出格式要求
+MULTI_CHUNK_INSTRUCTION = """
+
+输入包含多个独立片段，每个片段以 <<<CHUNK 序号>>> 开头、以 <<<END>>> 结尾。
+请按上述要求分别处理每个片段，片段之间互不影响，并且只输出如下 JSON：
+{"chunks": [{"i": 0, "text": "片段 0 的处理结果"}, {"i": 1, "text": "片段 1 的处理结果"}]}
+每个输入片段必须恰好对应一项，i 为片段序号。"""
+
+# HTTP 连接池配置
+HTTP_MAX_CONNECTIONS = 64
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+HTTP_KEEPALIVE_EXPIRY = 30.0
+HTTP_READ_TIMEOUT = 600.0  # 长文本摘要生成可能需要数分钟
+HTTP_CONNECT_TIMEOUT = 10.0
+
+
+# ============ HTTP 连接池 ============
+
+# httpx 的 HTTP/2 支持依赖 h2 包；未安装时退回 HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+)
+_HTTP_TIMEOUT = httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+# 所有同步客户端共享同一个连接池，复用已建立的 TCP/TLS 连接；
+# 启用 HTTP/2 时并发请求在同一连接上多路复用（服务端不支持时通过 ALPN 自动回退）
+_http_client = httpx.Client(http2=HTTP2_ENABLED, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+atexit.register(_http_client.close)
+
+# 限流配置（按账户的 RPM/TPM 配额调整）
+DEFAULT_RPM = 500
+DEFAULT_TPM = 1_000_000
+RATE_LIMIT_POLL_INTERVAL = 0.1  # 令牌桶补充检查间隔（秒）
+CHARS_PER_TOKEN = 3             # 估算 token 数用的平均字符数（中文偏多）
 
 
 def create_client(api_key: str) -> OpenAI:
     """
-    创建 OpenAI 客户端实例
+    创建 OpenAI 客户端实例（共享模块级 HTTP 连接池）
 
     参数:
         api_key: API 密钥
@@ -26,7 +118,260 @@ def create_client(api_key: str) -> OpenAI:
     返回:
         OpenAI 客户端实例
     """
-    return OpenAI(api_key=api_key, base_url=API_BASE_URL)
+    return OpenAI(api_key=api_key, base_url=API_BASE_URL, http_client=_http_client)
+
+
+def create_async_client(api_key: str) -> AsyncOpenAI:
+    """
+    创建异步 OpenAI 客户端实例
+
+    异步连接池绑定创建它的事件循环，因此每个客户端使用独立的连接池（配置相同），
+    使用完毕后应调用 await client.close()
+
+    参数:
+        api_key: API 密钥
+
+    返回:
+        AsyncOpenAI 客户端实例
+    """
+    http_client = httpx.AsyncClient(http2=HTTP2_ENABLED, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+    return AsyncOpenAI(api_key=api_key, base_url=API_BASE_URL, http_client=http_client)
+
+
+def _warm_up(client: OpenAI) -> None:
+    """发送轻量请求预热连接，失败忽略"""
+    try:
+        client.models.list()
+    except Exception:
+        pass
+
+
+def warm_up(client: OpenAI, background: bool = True) -> None:
+    """
+    预热连接：发送一个轻量请求，提前完成 DNS 解析和 TCP/TLS 握手
+
+    连接保留在共享连接池中，第一个正式请求无需再承担建连延迟。
+    预热失败会被忽略，不影响后续调用
+
+    参数:
+        client: OpenAI 客户端实例
+        background: 是否在后台线程中预热（与文件预处理等本地工作重叠）
+    """
+    if background:
+        threading.Thread(target=_warm_up, args=(client,), daemon=True).start()
+    else:
+        _warm_up(client)
+
+
+async def awarm_up(client: AsyncOpenAI) -> None:
+    """预热异步客户端的连接（warm_up 的协程版本），失败会被忽略"""
+    try:
+        await client.models.list()
+    except Exception:
+        pass
+
+
+# ============ JSON 编解码 ============
+
+def json_dumps(obj) -> bytes:
+    """将对象序列化为 UTF-8 JSON 字节串（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def json_loads(data: str | bytes):
+    """解析 JSON 字符串或字节串（优先使用 orjson），失败时抛出 ValueError"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# ============ 限流冷却 ============
+
+class _RateGate:
+    """
+    进程内共享的限流冷却闸门（线程安全）
+
+    服务端通过 Retry-After 要求等待时记录冷却截止时间，
+    所有调用方在发出请求前检查，冷却期内不再发送注定失败的请求
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+
+    def remaining(self) -> float:
+        """距冷却结束的剩余秒数"""
+        with self._lock:
+            return max(0.0, self._cooldown_until - time.monotonic())
+
+    def wait(self) -> None:
+        """阻塞等待直到冷却结束"""
+        delay = self.remaining()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self) -> None:
+        """异步等待直到冷却结束（不阻塞事件循环）"""
+        delay = self.remaining()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def mark_rate_limited(self, until_ts: float) -> None:
+        """
+        记录冷却截止时间
+
+        参数:
+            until_ts: 冷却结束的 time.monotonic() 时间点
+        """
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, until_ts)
+
+
+_gate = _RateGate()
+
+
+def _retry_after_seconds(error: BaseException) -> float | None:
+    """从错误响应的 Retry-After 头读取建议等待秒数（支持秒数和 HTTP 日期两种格式）"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _observe_rate_limit(error: BaseException) -> None:
+    """遇到带 Retry-After 的 429/503 响应时，让所有调用方进入冷却"""
+    if getattr(error, "status_code", None) not in COOLDOWN_STATUS_CODES:
+        return
+    retry_after = _retry_after_seconds(error)
+    if retry_after is not None:
+        _gate.mark_rate_limited(time.monotonic() + min(retry_after, MAX_RETRY_DELAY))
+
+
+def _compute_retry_delay(attempt: int, retry_delay: float, error: BaseException) -> float:
+    """
+    计算第 attempt 次失败后的等待时间
+
+    优先使用服务端 Retry-After；否则为带随机抖动的指数退避，
+    避免多个并发调用方在同一时刻集中重试。两者都不超过 MAX_RETRY_DELAY，
+    防止异常的 Retry-After（如 3600 秒或数小时后的日期）让进程长时间挂起
+    """
+    retry_after = _retry_after_seconds(error)
+    if retry_after is not None:
+        return min(retry_after, MAX_RETRY_DELAY)
+    return min((2 ** attempt) * retry_delay + random.random(), MAX_RETRY_DELAY)
+
+
+# ============ 响应缓存 ============
+
+class _ResponseCache:
+    """
+    基于 SQLite 的 API 响应缓存（线程安全，首次使用时才创建数据库）
+
+    缓存读写失败时视为未命中，不影响正常的 API 调用
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.enabled = True  # 关闭后 get 总是未命中、set 不写入，也不会创建数据库
+        self._path = cache_dir / "responses.sqlite3"
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> str | None:
+        """读取未过期的缓存值，未命中返回 None"""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        except (sqlite3.Error, OSError):
+            return None
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str, expire: float) -> None:
+        """写入缓存值，expire 为有效期（秒）"""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, time.time() + expire),
+                )
+                conn.commit()
+        except (sqlite3.Error, OSError):
+            pass
+
+
+_response_cache = _ResponseCache(RESPONSE_CACHE_DIR)
+
+
+def set_response_cache_enabled(enabled: bool) -> None:
+    """
+    开启或关闭本地响应缓存（对所有调用生效，关闭后不读取也不写入文稿内容）
+
+    参数:
+        enabled: 是否启用缓存
+    """
+    _response_cache.enabled = enabled
+
+
+def _response_cache_key(
+    system_prompt: str,
+    user_content: str,
+    response_format: dict | None = None,
+) -> str:
+    """按模型、系统提示词、用户内容和输出格式约束计算缓存键"""
+    data = f"{MODEL_NAME}\0{system_prompt}\0{user_content}"
+    if response_format:
+        # 无格式约束时保持原有键，已有缓存继续有效
+        data += "\0" + json.dumps(response_format, sort_keys=True)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=SYSTEM_MESSAGE_CACHE_SIZE)
+def make_system_message(system_prompt: str) -> dict:
+    """
+    构造系统消息（按提示词缓存，同一提示词的所有请求共享同一个字典）
+
+    返回的字典被多个请求共享，调用方不应修改
+    """
+    return {"role": "system", "content": system_prompt}
+
+
+def _build_messages(system_prompt: str, user_content: str) -> list[dict]:
+    """构造 chat.completions 请求的 messages 列表（只为用户内容新建字典）"""
+    return [make_system_message(system_prompt), {"role": "user", "content": user_content}]
 
 
 def call_deepseek_api(
@@ -35,38 +380,465 @@ def call_deepseek_api(
     user_content: str,
     max_retries: int = DEFAULT_MAX_RETRIES,
     retry_delay: float = DEFAULT_RETRY_DELAY,
+    response_format: dict | None = None,
+    use_cache: bool = True,
 ) -> str:
     """
     调用 DeepSeek API 处理文本
 
+    相同模型、系统提示词、用户内容和输出格式约束的成功结果会缓存到本地，再次调用时直接返回
+
     参数:
         client: OpenAI 客户端实例
         system_prompt: 系统提示词
         user_content: 用户输入内容
         max_retries: 最大重试次数
-        retry_delay: 重试延迟（秒）
+        retry_delay: 首次重试的基础延迟（秒），之后按指数退避
+        response_format: 可选的输出格式约束，如 {"type": "json_object"}
+        use_cache: 是否读写响应缓存（回归测试等需要真实调用时设为 False）
 
     返回:
         API 返回的文本内容
 
     异常:
-        当所有重试都失败时，抛出原始异常
+        当所有重试都失败时，抛出原始异常；不可重试的错误立即抛出
+    """
+    if use_cache:
+        cache_key = _response_cache_key(system_prompt, user_content, response_format)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    request_options = {"response_format": response_format} if response_format else {}
+    for attempt in range(max_retries):
+        _gate.wait()
+        try:
+            response = client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=_build_messages(system_prompt, user_content),
+                stream=False,
+                **request_options
+            )
+            result = response.choices[0].message.content
+            if use_cache and result is not None:
+                _response_cache.set(cache_key, result, RESPONSE_CACHE_TTL)
+            return result
+        except RETRYABLE_ERRORS as e:
+            _observe_rate_limit(e)
+            if attempt < max_retries - 1:
+                delay = _compute_retry_delay(attempt, retry_delay, e)
+                print(f"  API 调用失败: {e}，{delay:.1f}秒后重试...")
+                time.sleep(delay)
+            else:
+                raise
+
+
+def stream_deepseek_api(
+    client: OpenAI,
+    system_prompt: str,
+    user_content: str,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> Iterator[str]:
+    """
+    流式调用 DeepSeek API，边生成边返回文本片段
+
+    调用方可在模型仍在生成时开始写入输出。流式响应无法从中断处续传：
+    收到第一个片段之前出错会重新发起整个请求，之后出错则直接抛出
+
+    参数:
+        client: OpenAI 客户端实例
+        system_prompt: 系统提示词
+        user_content: 用户输入内容
+        max_retries: 最大重试次数
+        retry_delay: 首次重试的基础延迟（秒），之后按指数退避
+
+    返回:
+        逐个产出文本片段的生成器
     """
     for attempt in range(max_retries):
+        _gate.wait()
+        received = False
         try:
             response = client.chat.completions.create(
                 model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
+                messages=_build_messages(system_prompt, user_content),
+                stream=True
+            )
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    received = True
+                    yield delta
+            return
+        except RETRYABLE_ERRORS as e:
+            _observe_rate_limit(e)
+            if received or attempt >= max_retries - 1:
+                raise
+            delay = _compute_retry_delay(attempt, retry_delay, e)
+            print(f"  API 调用失败: {e}，{delay:.1f}秒后重试...")
+            time.sleep(delay)
+
+
+# ============ 多片段合并请求 ============
+
+def _split_multi_response(response_text: str, count: int) -> list[str]:
+    """
+    解析多片段请求返回的 JSON，按片段序号对齐
+
+    异常:
+        ValueError: JSON 无法解析或缺少某个片段的结果
+    """
+    try:
+        items = json_loads(response_text)["chunks"]
+        texts = {int(item["i"]): item["text"] for item in items}
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"返回的 JSON 结构不符合要求: {e}") from e
+
+    missing = [i for i in range(count) if not isinstance(texts.get(i), str)]
+    if missing:
+        raise ValueError(f"缺少片段 {missing} 的结果")
+    return [texts[i] for i in range(count)]
+
+
+def call_deepseek_api_multi(
+    client: OpenAI,
+    system_prompt: str,
+    user_contents: list[str],
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> list[str]:
+    """
+    将多个独立片段合并为一次请求处理，减少请求次数
+
+    适用于 RPM 受限而单次请求 token 余量充足的场景。返回结果无法解析时，
+    自动回退为逐个片段单独调用
+
+    参数:
+        client: OpenAI 客户端实例
+        system_prompt: 系统提示词（会附加 JSON 输出格式要求）
+        user_contents: 片段内容列表
+        max_retries: 最大重试次数
+        retry_delay: 首次重试的基础延迟（秒），之后按指数退避
+
+    返回:
+        与 user_contents 顺序一致的结果列表
+    """
+    if len(user_contents) <= 1:
+        return [
+            call_deepseek_api(client, system_prompt, content, max_retries, retry_delay)
+            for content in user_contents
+        ]
+
+    packed = "\n".join(
+        f"<<<CHUNK {i}>>>\n{content}\n<<<END>>>" for i, content in enumerate(user_contents)
+    )
+    response_text = call_deepseek_api(
+        client,
+        system_prompt + MULTI_CHUNK_INSTRUCTION,
+        packed,
+        max_retries,
+        retry_delay,
+        response_format={"type": "json_object"},
+    )
+    try:
+        return _split_multi_response(response_text, len(user_contents))
+    except ValueError as e:
+        print(f"  合并请求结果解析失败: {e}，改为逐个片段调用...")
+        return [
+            call_deepseek_api(client, system_prompt, content, max_retries, retry_delay)
+            for content in user_contents
+        ]
+
+
+# ============ 线程池并发调用 ============
+
+def call_deepseek_api_parallel(
+    client: OpenAI,
+    jobs: list[ApiJob],
+    workers: int = DEFAULT_WORKERS,
+) -> Iterator[tuple[int, str | BaseException]]:
+    """
+    使用线程池并发调用 DeepSeek API（无需改用 asyncio 的同步调用方）
+
+    等待网络响应时会释放 GIL，多个请求的等待时间可以重叠；
+    OpenAI 客户端底层的 httpx.Client 是线程安全的，可在线程间共享
+
+    参数:
+        client: OpenAI 客户端实例
+        jobs: 任务列表，每项为 (system_prompt, user_content)
+        workers: 线程数
+
+    返回:
+        按完成顺序产出 (任务序号, 结果) 的生成器；失败的任务结果为异常对象
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(call_deepseek_api, client, system_prompt, user_content): i
+            for i, (system_prompt, user_content) in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], error if error is not None else future.result()
+
+
+# ============ 异步调用 ============
+
+async def acall_deepseek_api(
+    client: AsyncOpenAI,
+    system_prompt: str,
+    user_content: str,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> str:
+    """
+    异步调用 DeepSeek API 处理文本（call_deepseek_api 的协程版本）
+
+    参数:
+        client: AsyncOpenAI 客户端实例
+        system_prompt: 系统提示词
+        user_content: 用户输入内容
+        max_retries: 最大重试次数
+        retry_delay: 首次重试的基础延迟（秒），之后按指数退避
+
+    返回:
+        API 返回的文本内容
+
+    异常:
+        当所有重试都失败时，抛出原始异常；不可重试的错误立即抛出
+    """
+    for attempt in range(max_retries):
+        await _gate.wait_async()
+        try:
+            response = await client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=_build_messages(system_prompt, user_content),
                 stream=False
             )
             return response.choices[0].message.content
-        except Exception as e:
+        except RETRYABLE_ERRORS as e:
+            _observe_rate_limit(e)
             if attempt < max_retries - 1:
-                print(f"  API 调用失败: {e}，{retry_delay}秒后重试...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
+                delay = _compute_retry_delay(attempt, retry_delay, e)
+                print(f"  API 调用失败: {e}，{delay:.1f}秒后重试...")
+                await asyncio.sleep(delay)
             else:
                 raise
+
+
+async def astream_deepseek_api(
+    client: AsyncOpenAI,
+    system_prompt: str,
+    user_content: str,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> AsyncIterator[str]:
+    """
+    异步流式调用 DeepSeek API（stream_deepseek_api 的协程版本）
+
+    参数:
+        client: AsyncOpenAI 客户端实例
+        system_prompt: 系统提示词
+        user_content: 用户输入内容
+        max_retries: 最大重试次数
+        retry_delay: 首次重试的基础延迟（秒），之后按指数退避
+
+    返回:
+        逐个产出文本片段的异步生成器
+    """
+    for attempt in range(max_retries):
+        await _gate.wait_async()
+        received = False
+        try:
+            response = await client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=_build_messages(system_prompt, user_content),
+                stream=True
+            )
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    received = True
+                    yield delta
+            return
+        except RETRYABLE_ERRORS as e:
+            _observe_rate_limit(e)
+            if received or attempt >= max_retries - 1:
+                raise
+            delay = _compute_retry_delay(attempt, retry_delay, e)
+            print(f"  API 调用失败: {e}，{delay:.1f}秒后重试...")
+            await asyncio.sleep(delay)
+
+
+async def acall_deepseek_api_batch(
+    client: AsyncOpenAI,
+    jobs: list[ApiJob],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> list[str | BaseException]:
+    """
+    并发调用 DeepSeek API 处理多个任务
+
+    同步代码可通过 asyncio.run(acall_deepseek_api_batch(...)) 调用
+
+    参数:
+        client: AsyncOpenAI 客户端实例
+        jobs: 任务列表，每项为 (system_prompt, user_content)
+        concurrency: 最大并发请求数
+
+    返回:
+        与 jobs 顺序一致的结果列表；失败的任务对应位置为异常对象
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_job(system_prompt: str, user_content: str) -> str:
+        async with semaphore:
+            return await acall_deepseek_api(client, system_prompt, user_content)
+
+    tasks = [run_job(system_prompt, user_content) for system_prompt, user_content in jobs]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ============ 限流并发调度 ============
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的 token 数"""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class RateLimiter:
+    """
+    令牌桶限流器：同时限制每分钟请求数 (RPM) 和每分钟 token 数 (TPM)
+
+    两个桶按经过的时间线性补充，只有两者都有余量时才放行请求
+    """
+
+    def __init__(self, rpm_capacity: int, tpm_capacity: int):
+        self.rpm_capacity = rpm_capacity
+        self.tpm_capacity = tpm_capacity
+        self.available_rpm = float(rpm_capacity)
+        self.available_tpm = float(tpm_capacity)
+        self._last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        """按距上次补充的时间补充两个令牌桶"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self.available_rpm = min(
+            self.rpm_capacity, self.available_rpm + self.rpm_capacity * elapsed / 60.0
+        )
+        self.available_tpm = min(
+            self.tpm_capacity, self.available_tpm + self.tpm_capacity * elapsed / 60.0
+        )
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        等待直到两个令牌桶都有足够余量，然后扣除
+
+        参数:
+            tokens: 本次请求预计消耗的 token 数
+        """
+        # 单个请求超过整个 TPM 配额时按满桶处理，避免永久等待
+        tokens = min(tokens, self.tpm_capacity)
+        while True:
+            self._refill()
+            if self.available_rpm >= 1 and self.available_tpm >= tokens:
+                self.available_rpm -= 1
+                self.available_tpm -= tokens
+                return
+            await asyncio.sleep(RATE_LIMIT_POLL_INTERVAL)
+
+
+class _QueuedJob:
+    """run_api_jobs 内部使用的任务记录"""
+
+    def __init__(self, index: int, system_prompt: str, user_content: str, attempts_left: int):
+        self.index = index
+        self.system_prompt = system_prompt
+        self.user_content = user_content
+        self.token_estimate = estimate_tokens(system_prompt) + estimate_tokens(user_content)
+        self.attempts_left = attempts_left
+        self.next_request_time = 0.0
+
+
+async def run_api_jobs(
+    client: AsyncOpenAI,
+    jobs: list[ApiJob],
+    rpm: int = DEFAULT_RPM,
+    tpm: int = DEFAULT_TPM,
+    max_attempts: int = DEFAULT_MAX_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+    result_queue: asyncio.Queue | None = None,
+) -> list[str | BaseException]:
+    """
+    在 RPM/TPM 限制内并发执行 API 任务
+
+    调度循环只在令牌桶有余量时发出请求；可重试的失败任务按指数退避时间
+    重新排队，而不是占用调度循环等待
+
+    参数:
+        client: AsyncOpenAI 客户端实例
+        jobs: 任务列表，每项为 (system_prompt, user_content)
+        rpm: 每分钟最大请求数
+        tpm: 每分钟最大 token 数
+        max_attempts: 每个任务的最大尝试次数
+        retry_delay: 首次重试的退避时间（秒）
+        result_queue: 可选的结果队列，每个任务结束时放入 (index, result)，便于调用方流式消费
+
+    返回:
+        与 jobs 顺序一致的结果列表；最终失败的任务对应位置为异常对象
+    """
+    limiter = RateLimiter(rpm, tpm)
+    pending: deque[_QueuedJob] = deque(
+        _QueuedJob(i, system_prompt, user_content, max_attempts)
+        for i, (system_prompt, user_content) in enumerate(jobs)
+    )
+    retry_queue: deque[_QueuedJob] = deque()
+    results: list[str | BaseException | None] = [None] * len(jobs)
+    in_flight: set[asyncio.Task] = set()
+
+    async def finish(job: _QueuedJob, result: str | BaseException) -> None:
+        results[job.index] = result
+        if result_queue is not None:
+            await result_queue.put((job.index, result))
+
+    async def attempt(job: _QueuedJob) -> None:
+        job.attempts_left -= 1
+        try:
+            result = await acall_deepseek_api(
+                client, job.system_prompt, job.user_content, max_retries=1
+            )
+        except RETRYABLE_ERRORS as e:
+            if job.attempts_left > 0:
+                delay = _compute_retry_delay(max_attempts - job.attempts_left - 1, retry_delay, e)
+                print(f"  任务 {job.index + 1} 调用失败: {e}，{delay:.1f}秒后重新排队...")
+                job.next_request_time = time.monotonic() + delay
+                retry_queue.append(job)
+            else:
+                await finish(job, e)
+            return
+        except Exception as e:
+            await finish(job, e)
+            return
+        await finish(job, result)
+
+    while pending or retry_queue or in_flight:
+        if retry_queue and retry_queue[0].next_request_time <= time.monotonic():
+            job = retry_queue.popleft()
+        elif pending:
+            job = pending.popleft()
+        else:
+            await asyncio.sleep(RATE_LIMIT_POLL_INTERVAL)
+            continue
+
+        await _gate.wait_async()
+        await limiter.acquire(job.token_estimate)
+        task = asyncio.create_task(attempt(job))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    return results
@@ -5,9 +5,29 @@
 """
 
 import os
+import re
+from functools import lru_cache
 from pathlib import Path
 
 
+# ============ 配置常量 ============
+
+CONFIG_CACHE_SIZE = 32
+
+# API key 文件中第一个非空、非注释（# 开头）的行
+# 首尾空白用 \s 匹配，与逐行 str.strip() 的结果一致（包括全角空格、\r、\x0b 等）
+_API_KEY_RE = re.compile(r'^\s*(?!#)(\S.*?)\s*$', re.MULTILINE)
+
+
+# ============ 模块导出声明 ============
+
+__all__ = [
+    'load_api_key',
+    'load_prompt',
+    'initialize_project_setup',
+]
+
+
 def _prompt_api_key(key_path: Path) -> str:
     """
     交互式提示用户输入 API key（内部辅助函数）
@@ -107,25 +127,40 @@ def load_api_key(key_path: str | Path, interactive: bool = True) -> str:
         ValueError: 无法读取有效的 API key
     """
     key_path = Path(key_path)
+    resolved = key_path.resolve()
+
+    # 直接 stat，避免 exists() 与读取之间的竞态
+    try:
+        mtime_ns = resolved.stat().st_mtime_ns
+    except FileNotFoundError:
+        # 如果文件不存在且启用交互模式
+        if interactive:
+            print(f"\n[WARN] API key 文件不存在: {key_path}")
+            print(f"[WARN] API key file not found: {key_path}")
+            return _prompt_api_key(key_path)
+        raise FileNotFoundError(f"API key 文件不存在: {key_path}") from None
+
+    return _load_api_key_impl(str(resolved), mtime_ns)
 
-    # 如果文件不存在且启用交互模式
-    if not key_path.exists() and interactive:
-        print(f"\n[WARN] API key 文件不存在: {key_path}")
-        print(f"[WARN] API key file not found: {key_path}")
-        return _prompt_api_key(key_path)
 
-    # 原有的读取逻辑（当文件存在或 interactive=False 时）
-    if not key_path.exists():
-        raise FileNotFoundError(f"API key 文件不存在: {key_path}")
+@lru_cache(maxsize=CONFIG_CACHE_SIZE)
+def _load_api_key_impl(path_str: str, mtime_ns: int) -> str:
+    """
+    读取并解析 API key 文件（按路径和修改时间缓存，文件修改后自动失效）
+
+    参数:
+        path_str: API key 文件的绝对路径
+        mtime_ns: 文件修改时间（纳秒），仅用作缓存键
 
-    content = key_path.read_text(encoding='utf-8').strip()
-    for line in content.split('\n'):
-        line = line.strip()
-        # 跳过注释行和空行
-        if line and not line.startswith('#'):
-            return line
+    返回:
+        API key 字符串
+    """
+    content = Path(path_str).read_text(encoding='utf-8')
+    match = _API_KEY_RE.search(content)
+    if match:
+        return match.group(1)
 
-    raise ValueError(f"无法从 {key_path} 读取有效的 API key")
+    raise ValueError(f"无法从 {path_str} 读取有效的 API key")
 
 
 def load_prompt(prompt_path: str | Path) -> str:
@@ -141,9 +176,25 @@ def load_prompt(prompt_path: str | Path) -> str:
     异常:
         FileNotFoundError: 文件不存在
     """
-    prompt_path = str(prompt_path)
-    if not os.path.exists(prompt_path):
-        raise FileNotFoundError(f"提示词文件不存在: {prompt_path}")
+    resolved = os.path.abspath(prompt_path)
+    try:
+        mtime_ns = os.stat(resolved).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"提示词文件不存在: {prompt_path}") from None
+
+    return _load_prompt_impl(resolved, mtime_ns)
+
+
+@lru_cache(maxsize=CONFIG_CACHE_SIZE)
+def _load_prompt_impl(path_str: str, mtime_ns: int) -> str:
+    """
+    读取提示词文件（按路径和修改时间缓存，文件修改后自动失效）
+
+    参数:
+        path_str: 提示词文件的绝对路径
+        mtime_ns: 文件修改时间（纳秒），仅用作缓存键
 
-    with open(prompt_path, 'r', encoding='utf-8') as f:
-        return f.read()
+    返回:
+        提示词内容
+    """
+    return Path(path_str).read_text(encoding='utf-8')
@@ -4,12 +4,19 @@
 支持格式: 现有时间戳、SRT字幕、纯文本
 """
 
+import argparse
+import mmap
+import os
 import re
 import sys
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import accumulate
 from pathlib import Path
-from typing import List, Optional, Tuple, Literal, Union, Callable
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple, Literal, Union, Callable, NoReturn
 
-import pysrt
+if TYPE_CHECKING:
+    import pysrt  # 运行时在 load_srt_file 中按需导入，非 SRT 输入无需加载
 
 # ============ 类型定义 ============
 
@@ -24,6 +31,42 @@ TIMESTAMP_PATTERN = r'\[(\d+\.\d+)s\s*-->\s*(\d+\.\d+)s\]'  # [0.5s --> 2.3s] 
 SRT_TIMESTAMP_PATTERN = r'\[(\d{2}:\d{2}:\d{2}[,\.]\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2}[,\.]\d{3})\]'  # [00:00:00.000 --> 00:00:03.080] 格式（支持逗号和点）
 SRT_TIME_PATTERN = r'^\d+\s*\n\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3}'  # 标准 SRT 字幕文件格式
 
+# 预编译正则（避免每次调用时查找 re 模块内部缓存）
+_TIMESTAMP_RE = re.compile(TIMESTAMP_PATTERN)
+_SRT_TIMESTAMP_RE = re.compile(SRT_TIMESTAMP_PATTERN)
+_SRT_TIME_RE = re.compile(SRT_TIME_PATTERN, re.MULTILINE)
+_SRT_TIMESTAMP_PARTS_RE = re.compile(  # 与 SRT_TIMESTAMP_PATTERN 匹配相同，按时间字段分组
+    r'\[(\d{2}):(\d{2}):(\d{2})[,\.](\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2})[,\.](\d{3})\]'
+)
+_LEADING_SPACE_RE = re.compile(r'\s*')
+# 格式检测：三种时间格式合并为一个正则，单次扫描样本，命中的分组名即格式名
+_FORMAT_PROBE_RE = re.compile(
+    f'(?P<srt_timestamp>{SRT_TIMESTAMP_PATTERN})'
+    f'|(?P<timestamp>{TIMESTAMP_PATTERN})'
+    f'|(?P<srt>{SRT_TIME_PATTERN})',
+    re.MULTILINE
+)
+_COMBINED_TS_RE = re.compile(f'(?:{SRT_TIMESTAMP_PATTERN})|(?:{TIMESTAMP_PATTERN})')  # 两种时间戳任选其一
+
+# 文件编码检测：BOM 直接确定编码，否则按顺序尝试解码
+_BOM_ENCODINGS = (
+    (b'\xef\xbb\xbf', 'utf-8'),
+    (b'\xff\xfe', 'utf-16-le'),
+    (b'\xfe\xff', 'utf-16-be'),
+)
+_TEXT_ENCODINGS = ('utf-8', 'gbk')  # 均失败时回退到 latin-1
+FORMAT_DETECT_CHARS = 64 * 1024  # 格式检测只扫描文本开头，时间格式若存在必然出现在开头
+FORMAT_DETECT_BYTES = FORMAT_DETECT_CHARS * 4  # 格式检测读取的字节数（UTF-8 每字符最多 4 字节）
+MMAP_MIN_BYTES = 1024 * 1024  # 小于该大小的文件直接读取，内存映射的建立开销不划算
+CLEAN_CHUNK_CHARS = 1024 * 1024  # 分块去除时间戳时每次读取的字符数
+CLEAN_MAX_CARRY_CHARS = 4 * 1024 * 1024  # 找不到安全切分点时最多积压的字符数，超出后强制切分
+CUT_SEARCH_CHARS = 4096  # 只在块末尾这么多字符内寻找切分点
+MAX_TIMESTAMP_CHARS = 64  # 时间戳的最大长度（实际 15~31 个字符，留出空白余量）
+
+# 输出文件分隔线
+_SEP60 = '=' * 60
+_DASH60 = '-' * 60
+
 # Markdown 分段配置常量
 DEFAULT_MD_CHAR_LIMIT = 5000      # Markdown 默认字数限制
 DEFAULT_MD_PARAGRAPH_LIMIT = 20   # Markdown 默认段落数限制
@@ -37,10 +80,13 @@ __all__ = [
     'ProcessMode',
     'TimestampInfo',
     'TimeDict',
+    'Timestamps',
     # 基础工具
     'normalize_whitespace',
     'remove_timestamps',
+    'remove_timestamps_from_file',
     'read_file_content',
+    'read_text_mapped',
     # 时间处理
     'extract_timestamps',
     'find_timestamp_at_position',
@@ -51,6 +97,7 @@ __all__ = [
     # 分段功能
     'segment_by_spaces',
     'segment_with_time_ranges',
+    'iter_segments_with_time_ranges',
     'segment_text_by_spaces',
     'segment_markdown_smart',
     # 格式检测
@@ -61,12 +108,14 @@ __all__ = [
     'srt_time_to_seconds',
     'process_srt_plain',
     'process_srt_with_time',
+    'iter_srt_with_time',
     'process_srt_slice',
     # SRT 时间戳格式支持
     'SRT_TIMESTAMP_PATTERN',
     'srt_timestamp_to_seconds',
     'extract_srt_timestamps',
     'segment_with_srt_timestamps',
+    'iter_segments_with_srt_timestamps',
     # Markdown 配置常量
     'DEFAULT_MD_CHAR_LIMIT',
     'DEFAULT_MD_PARAGRAPH_LIMIT',
@@ -75,9 +124,7 @@ __all__ = [
 
 # ============ 帮助信息 ============
 
-def print_help() -> None:
-    """打印完整帮助信息"""
-    print("""
+_HELP_TEXT = """
 通用文本处理器 v1.0
 支持格式: 现有时间戳、SRT字幕、纯文本
 
@@ -109,17 +156,20 @@ def print_help() -> None:
   python preprocessor.py subtitles.srt --mode slice --start 2m30s --end 5m45s
 
 输出文件保存在: output/ 目录
-""")
+"""
+
+
+def print_help() -> None:
+    """打印完整帮助信息"""
+    print(_HELP_TEXT)
 
 
 # ============ 基础工具函数 ============
 
 def normalize_whitespace(text: str) -> str:
     """规范化空格：换行转空格，去除多余空格"""
-    text = text.replace('\n', ' ')
-    text = re.sub(r'^\s+', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    # str.split() 按任意空白切分并丢弃空串，一次扫描完成换行转换、合并空白和首尾去除
+    return ' '.join(text.split())
 
 
 def remove_timestamps(text: str) -> str:
@@ -136,11 +186,78 @@ def remove_timestamps(text: str) -> str:
     返回:
         去除时间戳并规范化后的文本
     """
-    # 先去除 SRT 时间戳
-    clean_text = re.sub(SRT_TIMESTAMP_PATTERN, ' ', text)
-    # 再去除标准时间戳
-    clean_text = re.sub(TIMESTAMP_PATTERN, ' ', clean_text)
-    return normalize_whitespace(clean_text)
+    # 一次扫描同时去除两种时间戳
+    return normalize_whitespace(_COMBINED_TS_RE.sub(' ', text))
+
+
+def _safe_cut(chunk: str) -> int:
+    """
+    在块末尾 CUT_SEARCH_CHARS 个字符内找一个可以切分的空白位置
+
+    切分点前 MAX_TIMESTAMP_CHARS 个字符内没有未闭合的 '['，保证没有时间戳跨越切分点；
+    空白本身也不会切断单词。只检查切分点附近，文中零散的未闭合 '['（如 "[音乐"）
+    不会影响之后的切分
+
+    返回:
+        切分位置；找不到时返回 -1
+    """
+    start = max(0, len(chunk) - CUT_SEARCH_CHARS)
+    cut = len(chunk)
+    while True:
+        cut = max(chunk.rfind(' ', start, cut), chunk.rfind('\n', start, cut))
+        if cut < 0:
+            return -1
+        window = max(0, cut - MAX_TIMESTAMP_CHARS)
+        if chunk.rfind('[', window, cut) <= chunk.rfind(']', window, cut):
+            return cut
+
+
+def remove_timestamps_from_file(
+    file_path: str,
+    chunk_chars: int = CLEAN_CHUNK_CHARS,
+) -> Tuple[str, int]:
+    """
+    分块读取 UTF-8 文件并去除时间戳，结果与 remove_timestamps(全文) 相同
+
+    每次读取 chunk_chars 个字符，在安全的空白处切分后清理，未处理的尾部并入下一块，
+    内存中只保留清理后的文本和当前块，不再同时持有原文全文。
+    积压超过 CLEAN_MAX_CARRY_CHARS 仍找不到安全切分点时（异常输入）强制切分
+
+    参数:
+        file_path: 文件路径
+        chunk_chars: 每次读取的字符数
+
+    返回:
+        (清理后的文本, 原始文本字符数)
+    """
+    pieces: List[str] = []
+    original_length = 0
+    carry = ''
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            original_length += len(chunk)
+            if not chunk:
+                break
+            chunk = carry + chunk
+            cut = _safe_cut(chunk)
+            if cut < 0:
+                if len(chunk) <= CLEAN_MAX_CARRY_CHARS:
+                    carry = chunk
+                    continue
+                # 强制切分：优先在最后一个空白处，保证积压的尾部不超过上限的一半
+                cut = max(chunk.rfind(' '), chunk.rfind('\n'))
+                if cut < len(chunk) - CLEAN_MAX_CARRY_CHARS // 2:
+                    cut = len(chunk)
+            cleaned = remove_timestamps(chunk[:cut])
+            if cleaned:
+                pieces.append(cleaned)
+            carry = chunk[cut:]
+
+    cleaned = remove_timestamps(carry)
+    if cleaned:
+        pieces.append(cleaned)
+    return ' '.join(pieces), original_length
 
 
 def srt_timestamp_to_seconds(srt_time: str) -> float:
@@ -173,29 +290,77 @@ def extract_srt_timestamps(text: str) -> List[Tuple[int, float, float, str]]:
     返回:
         [(end_position, start_time, end_time, original_timestamp), ...]
     """
-    results: List[Tuple[int, float, float, str]] = []
-    for match in re.finditer(SRT_TIMESTAMP_PATTERN, text):
-        start_time_str = match.group(1)
-        end_time_str = match.group(2)
-        start_time = srt_timestamp_to_seconds(start_time_str)
-        end_time = srt_timestamp_to_seconds(end_time_str)
-        original_timestamp = match.group(0)
-        results.append((match.end(), start_time, end_time, original_timestamp))
-    return results
+    matches = list(_SRT_TIMESTAMP_PARTS_RE.finditer(text))
+    columns = _srt_timestamp_columns(matches)
+    return list(zip(
+        columns.end_pos, columns.start_s, columns.end_s,
+        [match.group(0) for match in matches]
+    ))
+
+
+def _decode_bytes(raw: bytes, errors: str = 'strict') -> str:
+    """
+    将文件字节解码为文本：先检查 BOM，否则依次尝试 utf-8、gbk，最后回退 latin-1
+
+    换行符统一为 LF，与文本模式 open() 的行为一致。
+    errors='replace' 时 utf-8 必定成功，适合解码可能截断在多字节字符中间的前缀。
+    """
+    for bom, encoding in _BOM_ENCODINGS:
+        if raw.startswith(bom):
+            text = raw[len(bom):].decode(encoding, errors='replace')
+            break
+    else:
+        for encoding in _TEXT_ENCODINGS:
+            try:
+                text = raw.decode(encoding, errors)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            # latin-1 可解码任意字节
+            text = raw.decode('latin-1')
+
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
 
 
 def read_file_content(file_path: str) -> str:
-    """读取文件内容，自动检测编码"""
-    encodings = ('utf-8', 'gbk', 'latin-1')
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                return f.read()
-        except (UnicodeDecodeError, LookupError):
-            continue
-    # 如果所有编码都失败，使用 latin-1 作为最后的回退
-    with open(file_path, 'r', encoding='latin-1', errors='replace') as f:
-        return f.read()
+    """读取文件内容，自动检测编码（只读取一次文件，在内存中尝试解码）"""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    return _decode_bytes(raw)
+
+
+def read_text_mapped(file_path: str) -> str:
+    """
+    以 UTF-8 读取整个文本文件，大文件通过内存映射顺序读取
+
+    结果与 open(file_path, 'r', encoding='utf-8').read() 相同（换行符统一为 LF）。
+    文件不小于 MMAP_MIN_BYTES 且平台支持 madvise 时，使用 mmap + MADV_SEQUENTIAL
+    直接从映射解码，不再额外复制一份字节数据，内核按顺序预读并及时回收已读页面。
+
+    参数:
+        file_path: 文件路径
+
+    返回:
+        文件文本内容
+
+    异常:
+        UnicodeDecodeError: 文件不是有效的 UTF-8 编码
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_MIN_BYTES or not hasattr(mmap, 'MADV_SEQUENTIAL'):
+            text = f.read().decode('utf-8')
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+                text = str(mm, 'utf-8')
+
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
 
 
 def time_dict_to_seconds(time_dict: TimeDict) -> float:
@@ -210,6 +375,33 @@ def time_dict_to_seconds(time_dict: TimeDict) -> float:
 
 # ============ 格式检测模块 ============
 
+def _probe_format(sample: str, priority: Tuple[FormatType, ...]) -> FormatType:
+    """
+    单次扫描样本，按优先级返回命中的时间格式
+
+    参数:
+        sample: 待检测的文本样本
+        priority: 格式优先级，靠前者优先
+
+    返回:
+        命中的最高优先级格式，均未命中时返回 "plain"
+    """
+    # 三种时间格式都包含 '-->'，没有则无需运行正则
+    if '-->' not in sample:
+        return "plain"
+
+    found = set()
+    for match in _FORMAT_PROBE_RE.finditer(sample):
+        found.add(match.lastgroup)
+        if match.lastgroup == priority[0]:
+            break
+
+    for fmt in priority:
+        if fmt in found:
+            return fmt
+    return "plain"
+
+
 def detect_file_format(file_path: str) -> FormatType:
     """
     自动检测输入文件格式
@@ -234,25 +426,10 @@ def detect_file_format(file_path: str) -> FormatType:
     if path_obj.suffix.lower() == '.srt':
         return "srt"
 
-    # 读取文件内容进行检测
-    content = read_file_content(file_path)
-
-    # 只需读取前2000字符用于检测
-    content = content[:2000]
-
-    # 检查 SRT 时间戳格式（.txt 文件中的 SRT 时间戳）
-    if re.search(SRT_TIMESTAMP_PATTERN, content):
-        return "srt_timestamp"
-
-    # 检查现有时间戳格式
-    if re.search(TIMESTAMP_PATTERN, content):
-        return "timestamp"
-
-    # 检查SRT内容格式
-    if re.search(SRT_TIME_PATTERN, content, re.MULTILINE):
-        return "srt"
-
-    return "plain"
+    # 只读取文件开头用于检测，不解码整个文件
+    with open(file_path, 'rb') as f:
+        raw = f.read(FORMAT_DETECT_BYTES)
+    return detect_text_format(_decode_bytes(raw, errors='replace'))
 
 
 def detect_text_format(text: str) -> FormatType:
@@ -268,25 +445,66 @@ def detect_text_format(text: str) -> FormatType:
         "srt" - SRT字幕格式
         "plain" - 纯文本
     """
-    # 只需读取前2000字符用于检测
-    sample = text[:2000] if len(text) > 2000 else text
+    # 只需扫描开头 FORMAT_DETECT_CHARS 个字符
+    sample = text[:FORMAT_DETECT_CHARS] if len(text) > FORMAT_DETECT_CHARS else text
 
-    # 检查 SRT 时间戳格式（.txt 文件中的 SRT 时间戳）
-    if re.search(SRT_TIMESTAMP_PATTERN, sample):
-        return "srt_timestamp"
+    # 优先级：SRT 时间戳 > 标准 SRT 字幕格式 > 现有时间戳
+    return _probe_format(sample, ("srt_timestamp", "srt", "timestamp"))
 
-    # 检查标准 SRT 字幕格式
-    if re.search(SRT_TIME_PATTERN, sample, re.MULTILINE):
-        return "srt"
 
-    # 检查现有时间戳格式
-    if re.search(TIMESTAMP_PATTERN, sample):
-        return "timestamp"
+# ============ 时间处理模块 ============
 
-    return "plain"
+class Timestamps:
+    """
+    时间戳的列式存储：结束位置、开始时间、结束时间分别存放在平行列表中
+
+    二分查找只访问 end_pos 列，不必为每个时间戳构造元组
+    """
+    def __init__(
+        self,
+        end_pos: List[int],
+        start_s: List[float],
+        end_s: List[float]
+    ):
+        self.end_pos = end_pos
+        self.start_s = start_s
+        self.end_s = end_s
+
+    def __len__(self) -> int:
+        return len(self.end_pos)
+
+    def time_range(self, orig_start: int, orig_end: int) -> str:
+        """
+        查找覆盖原文区间 [orig_start, orig_end] 的时间范围
+
+        时间戳位于其文本之前，因此覆盖某个位置的是结束位置不超过它的最后一个时间戳；
+        位于第一个时间戳之前的文本归入第一个时间戳。
+        """
+        if not self.end_pos:
+            return format_time_range(None, None)
+        i = bisect_right(self.end_pos, orig_start) - 1
+        j = bisect_right(self.end_pos, orig_end) - 1
+        return format_time_range(self.start_s[max(i, 0)], self.end_s[max(j, 0)])
+
+
+def _timestamp_columns(matches: List[re.Match[str]]) -> Timestamps:
+    """由 TIMESTAMP_PATTERN 的匹配结果构建列式时间戳"""
+    return Timestamps(
+        [match.end() for match in matches],
+        [float(match.group(1)) for match in matches],
+        [float(match.group(2)) for match in matches],
+    )
 
 
-# ============ 时间处理模块 ============
+def _srt_timestamp_columns(matches: List[re.Match[str]]) -> Timestamps:
+    """由 _SRT_TIMESTAMP_PARTS_RE 的匹配结果构建列式时间戳（时、分、秒、毫秒已分组捕获）"""
+    fields = [tuple(map(int, match.groups())) for match in matches]
+    return Timestamps(
+        [match.end() for match in matches],
+        [h * 3600 + m * 60 + s + ms / 1000.0 for h, m, s, ms, *_ in fields],
+        [h * 3600 + m * 60 + s + ms / 1000.0 for *_, h, m, s, ms in fields],
+    )
+
 
 def extract_timestamps(text: str) -> List[TimestampInfo]:
     """
@@ -298,26 +516,24 @@ def extract_timestamps(text: str) -> List[TimestampInfo]:
     返回:
         [(end_position, start_time, end_time), ...]
     """
-    results: List[TimestampInfo] = []
-    for match in re.finditer(TIMESTAMP_PATTERN, text):
-        start_time = float(match.group(1))
-        end_time = float(match.group(2))
-        results.append((match.end(), start_time, end_time))
-    return results
+    columns = _timestamp_columns(list(_TIMESTAMP_RE.finditer(text)))
+    return list(zip(columns.end_pos, columns.start_s, columns.end_s))
 
 
 def find_timestamp_at_position(
     position: int,
     timestamps: List[TimestampInfo],
-    find_first: bool = True
+    find_first: bool = True,
+    positions: Optional[List[int]] = None
 ) -> Optional[float]:
     """
-    找到指定位置附近的时间戳
+    找到指定位置附近的时间戳（二分查找）
 
     参数:
         position: 原始文本中的位置
-        timestamps: 时间戳列表
+        timestamps: 时间戳列表（按位置升序）
         find_first: True 找第一个，False 找最后一个
+        positions: 预先提取的位置列，多次查询时由调用方传入以免重复构建
 
     返回:
         时间值（秒），如果没有找到返回 None
@@ -325,19 +541,19 @@ def find_timestamp_at_position(
     if not timestamps:
         return None
 
+    if positions is None:
+        positions = [t[0] for t in timestamps]
+
     if find_first:
-        for pos, start, _ in timestamps:
-            if pos >= position:
-                return start
+        idx = bisect_left(positions, position)
+        if idx < len(timestamps):
+            return timestamps[idx][1]
         return timestamps[-1][1]
     else:
-        result = None
-        for pos, _, end in timestamps:
-            if pos <= position:
-                result = end
-            else:
-                break
-        return result
+        idx = bisect_right(positions, position) - 1
+        if idx >= 0:
+            return timestamps[idx][2]
+        return None
 
 
 def format_seconds(seconds: float) -> str:
@@ -365,6 +581,27 @@ def format_time_range(start_ts: Optional[float], end_ts: Optional[float]) -> str
     return f"【{format_seconds(start_ts)} - {format_seconds(end_ts)}】"
 
 
+# 灵活时间输入的解析规则（模块加载时编译一次），按顺序尝试，取第一个匹配
+_TIME_PATTERNS: List[Tuple[re.Pattern[str], Callable[[Tuple[str, ...]], TimeDict]]] = [
+    # SRT 格式: HH:MM:SS,mmm
+    (re.compile(r'(\d+):(\d+):(\d+),(\d+)'),
+     lambda m: {'hours': int(m[0]), 'minutes': int(m[1]),
+                'seconds': int(m[2]), 'milliseconds': int(m[3])}),
+    # MM:SS 格式
+    (re.compile(r'(\d+):(\d+)'),
+     lambda m: {'minutes': int(m[0]), 'seconds': int(m[1])}),
+    # MMmSSs 格式
+    (re.compile(r'(\d+)m(\d+)s'),
+     lambda m: {'minutes': int(m[0]), 'seconds': int(m[1])}),
+    # MMm 格式
+    (re.compile(r'(\d+)m\s*$'),
+     lambda m: {'minutes': int(m[0]), 'seconds': 0}),
+    # SSs 格式
+    (re.compile(r'(\d+)s\s*$'),
+     lambda m: {'seconds': int(m[0])}),
+]
+
+
 def parse_time_input(time_str: str) -> TimeDict:
     """
     解析灵活的时间输入格式
@@ -376,27 +613,9 @@ def parse_time_input(time_str: str) -> TimeDict:
         包含 hours, minutes, seconds, milliseconds 的字典
     """
     time_str = time_str.strip()
-    patterns: List[Tuple[str, Callable[[Tuple[str, ...]], TimeDict]]] = [
-        # SRT 格式: HH:MM:SS,mmm
-        (r'(\d+):(\d+):(\d+),(\d+)',
-         lambda m: {'hours': int(m[0]), 'minutes': int(m[1]),
-                    'seconds': int(m[2]), 'milliseconds': int(m[3])}),
-        # MM:SS 格式
-        (r'(\d+):(\d+)',
-         lambda m: {'minutes': int(m[0]), 'seconds': int(m[1])}),
-        # MMmSSs 格式
-        (r'(\d+)m(\d+)s',
-         lambda m: {'minutes': int(m[0]), 'seconds': int(m[1])}),
-        # MMm 格式
-        (r'(\d+)m\s*$',
-         lambda m: {'minutes': int(m[0]), 'seconds': 0}),
-        # SSs 格式
-        (r'(\d+)s\s*$',
-         lambda m: {'seconds': int(m[0])}),
-    ]
 
-    for pattern, builder in patterns:
-        match = re.match(pattern, time_str)
+    for pattern, builder in _TIME_PATTERNS:
+        match = pattern.match(time_str)
         if match:
             return builder(match.groups())
 
@@ -411,35 +630,67 @@ def parse_time_input(time_str: str) -> TimeDict:
 
 # ============ 分段处理模块 ============
 
-def segment_text_by_spaces(
+def _compute_segments(
     text: str,
+    space_count: int,
     min_spaces: int,
     max_spaces: int
 ) -> List[Tuple[int, int]]:
     """
-    按空格数量计算分段位置
+    计算分段边界：整段由正则 finditer 一次扫描得到，只有末段在 Python 层单独处理
+
+    参数:
+        text: 待分段文本
+        space_count: text 中的空格总数
+        min_spaces: 每段最少空格数（剩余空格不足时，该段延伸到文本末尾）
+        max_spaces: 每段最多空格数
 
     返回:
         [(start_idx, end_idx), ...] 分段位置列表
     """
-    space_positions = [i for i, char in enumerate(text) if char == ' ']
-    segments: List[Tuple[int, int]] = []
-    start_idx = 0
-    i = 0
+    # 每个匹配恰好包含 max_spaces 个空格；剩余空格不足时后续位置均无法匹配，
+    # 因此 finditer 得到的就是从文本开头起首尾相接的全部整段
+    chunk_re = re.compile(f'(?:[^ ]* ){{{max_spaces}}}')
+    ends = [m.end() for m in chunk_re.finditer(text)]
+
+    # 第 k 段开始时剩余 space_count - k * max_spaces 个空格，不少于 min_spaces 才按整段切分
+    full_limit = (space_count - min_spaces) // max_spaces + 1 if space_count >= min_spaces else 0
+    empty_tail = 0
+    if len(ends) > full_limit:
+        # 仅当 min_spaces > max_spaces 时出现：末段延伸到文本末尾，
+        # 与逐段推进的实现一致，剩余的步数各产生一个空段
+        empty_tail = -(-(space_count - full_limit * max_spaces) // max_spaces) - 1
+        del ends[full_limit:]
+        tail_end = len(text)
+    else:
+        remaining = space_count - len(ends) * max_spaces
+        if not remaining:
+            tail_end = None
+        elif remaining < min_spaces:
+            tail_end = len(text)
+        else:
+            # 最后一段不足 max_spaces 个空格：结束于最后一个空格之后
+            tail_end = text.rfind(' ') + 1
 
-    while i < len(space_positions):
-        target_end = min(i + max_spaces, len(space_positions))
+    segments = list(zip([0] + ends, ends))
+    if tail_end is not None:
+        segments.append((ends[-1] if ends else 0, tail_end))
+        segments.extend([(tail_end, tail_end)] * empty_tail)
+    return segments
 
-        if len(space_positions) - i < min_spaces:
-            end_idx = len(text)
-        else:
-            end_idx = space_positions[target_end - 1] + 1
 
-        segments.append((start_idx, end_idx))
-        start_idx = end_idx
-        i = target_end
+def segment_text_by_spaces(
+    text: str,
+    min_spaces: int,
+    max_spaces: int
+) -> List[Tuple[int, int]]:
+    """
+    按空格数量计算分段位置
 
-    return segments
+    返回:
+        [(start_idx, end_idx), ...] 分段位置列表
+    """
+    return _compute_segments(text, text.count(' '), min_spaces, max_spaces)
 
 
 def segment_by_spaces(text: str, min_spaces: int = 50, max_spaces: int = 60) -> List[str]:
@@ -458,104 +709,153 @@ def segment_by_spaces(text: str, min_spaces: int = 50, max_spaces: int = 60) ->
     return [text[start:end].strip() for start, end in segments if text[start:end].strip()]
 
 
-def segment_with_time_ranges(
+def _blank_out_timestamps(text: str, pattern: re.Pattern[str]) -> str:
+    """将时间戳替换为等长空格，使结果与原文逐字符对齐"""
+    return pattern.sub(lambda m: ' ' * (m.end() - m.start()), text)
+
+
+def _skip_words(text: str, pos: int, count: int) -> int:
+    """从 pos 起跳过 count 个词，返回最后一个被跳过的词的末尾位置"""
+    if count <= 0:
+        return pos
+    return re.compile(rf'(?:\s*\S+){{{count}}}').match(text, pos).end()
+
+
+def _map_segments_to_original(
+    clean_text: str,
+    aligned_text: str,
+    segments: List[Tuple[int, int]]
+) -> List[Tuple[int, int]]:
+    """
+    将干净文本中的分段位置精确映射回原文
+
+    干净文本由 aligned_text 的词以单个空格连接而成，因此第 k 个词在两者中一一对应。
+    按分段顺序单向推进，每段用一次正则匹配跳过整段的词，只在分段边界处定位。
+
+    参数:
+        clean_text: 规范化空白后的文本
+        aligned_text: 时间戳已替换为等长空格、与原文对齐的文本
+        segments: clean_text 中的 [(start_idx, end_idx), ...]
+
+    返回:
+        [(段首词在原文中的起点, 段末词在原文中的终点), ...]
+    """
+    mapped: List[Tuple[int, int]] = []
+    clean_pos = 0     # 已统计空格的干净文本位置
+    words_before = 0  # clean_pos 之前的词数
+    orig_pos = 0      # 原文中已越过的词的末尾位置
+    words_done = 0    # 原文中已越过的词数
+
+    for start_idx, end_idx in segments:
+        if start_idx >= end_idx:
+            mapped.append((orig_pos, orig_pos))
+            continue
+        first_word = words_before + clean_text.count(' ', clean_pos, start_idx)
+        last_word = first_word + clean_text.count(' ', start_idx, end_idx - 1)
+        clean_pos, words_before = start_idx, first_word
+
+        orig_pos = _skip_words(aligned_text, orig_pos, first_word - words_done)
+        orig_start = _LEADING_SPACE_RE.match(aligned_text, orig_pos).end()
+        orig_pos = _skip_words(aligned_text, orig_pos, last_word + 1 - first_word)
+        words_done = last_word + 1
+
+        mapped.append((orig_start, orig_pos))
+
+    return mapped
+
+
+def _iter_timestamp_segments(
     text: str,
-    min_spaces: int = 50,
-    max_spaces: int = 60
-) -> List[str]:
+    timestamps: Timestamps,
+    pattern: re.Pattern[str],
+    min_spaces: int,
+    max_spaces: int
+) -> Iterator[str]:
     """
-    分段并保留时间范围（现有格式）
+    逐段生成带时间范围的段落（时间戳嵌在文本中的格式）
 
     参数:
         text: 原始文本（包含时间戳）
+        timestamps: 从 text 提取的列式时间戳
+        pattern: 用于去除时间戳的正则
         min_spaces: 每段最少空格数
         max_spaces: 每段最多空格数
 
     返回:
-        带时间范围的段落列表
+        段落生成器，每项为 "时间范围\\n段落内容"
     """
-    timestamps = extract_timestamps(text)
-    clean_text = re.sub(TIMESTAMP_PATTERN, ' ', text)
-    clean_text = normalize_whitespace(clean_text)
+    # 去除时间戳（替换为等长空格以保持与原文对齐）
+    aligned_text = _blank_out_timestamps(text, pattern)
+    clean_text = normalize_whitespace(aligned_text)
 
     segments = segment_text_by_spaces(clean_text, min_spaces, max_spaces)
-    results: List[str] = []
+    original_spans = _map_segments_to_original(clean_text, aligned_text, segments)
 
-    for start_idx, end_idx in segments:
+    for (start_idx, end_idx), (original_start, original_end) in zip(segments, original_spans):
         segment = clean_text[start_idx:end_idx].strip()
         if not segment:
             continue
 
-        # 计算该段在原始文本中的大致位置
-        ratio_start = start_idx / len(clean_text) if clean_text else 0
-        ratio_end = end_idx / len(clean_text) if clean_text else 0
-
-        original_start = int(ratio_start * len(text))
-        original_end = int(ratio_end * len(text))
+        time_range = timestamps.time_range(original_start, original_end)
+        yield f"{time_range}\n{segment}"
 
-        first_ts = find_timestamp_at_position(original_start, timestamps, find_first=True)
-        last_ts = find_timestamp_at_position(original_end, timestamps, find_first=False)
 
-        time_range = format_time_range(first_ts, last_ts)
-        results.append(f"{time_range}\n{segment}")
-
-    return results
+def iter_segments_with_time_ranges(
+    text: str,
+    min_spaces: int = 50,
+    max_spaces: int = 60
+) -> Iterator[str]:
+    """逐段生成带时间范围的段落（现有格式），参数同 segment_with_time_ranges"""
+    timestamps = _timestamp_columns(list(_TIMESTAMP_RE.finditer(text)))
+    return _iter_timestamp_segments(text, timestamps, _TIMESTAMP_RE, min_spaces, max_spaces)
 
 
-def segment_with_srt_timestamps(
+def segment_with_time_ranges(
     text: str,
     min_spaces: int = 50,
     max_spaces: int = 60
 ) -> List[str]:
     """
-    分段并保留 SRT 时间戳范围
+    分段并保留时间范围（现有格式）
 
     参数:
-        text: 原始文本（包含 SRT 时间戳）
+        text: 原始文本（包含时间戳）
         min_spaces: 每段最少空格数
         max_spaces: 每段最多空格数
 
     返回:
         带时间范围的段落列表
     """
-    srt_timestamps = extract_srt_timestamps(text)
-    # 去除 SRT 时间戳
-    clean_text = re.sub(SRT_TIMESTAMP_PATTERN, ' ', text)
-    clean_text = normalize_whitespace(clean_text)
+    return list(iter_segments_with_time_ranges(text, min_spaces, max_spaces))
 
-    segments = segment_text_by_spaces(clean_text, min_spaces, max_spaces)
-    results: List[str] = []
-
-    for start_idx, end_idx in segments:
-        segment = clean_text[start_idx:end_idx].strip()
-        if not segment:
-            continue
 
-        # 计算该段在原始文本中的大致位置
-        ratio_start = start_idx / len(clean_text) if clean_text else 0
-        ratio_end = end_idx / len(clean_text) if clean_text else 0
-
-        original_start = int(ratio_start * len(text))
-        original_end = int(ratio_end * len(text))
+def iter_segments_with_srt_timestamps(
+    text: str,
+    min_spaces: int = 50,
+    max_spaces: int = 60
+) -> Iterator[str]:
+    """逐段生成带 SRT 时间戳范围的段落，参数同 segment_with_srt_timestamps"""
+    timestamps = _srt_timestamp_columns(list(_SRT_TIMESTAMP_PARTS_RE.finditer(text)))
+    return _iter_timestamp_segments(text, timestamps, _SRT_TIMESTAMP_RE, min_spaces, max_spaces)
 
-        # 找到对应的时间戳
-        first_ts = None
-        last_ts = None
-        for pos, start, end, _ in srt_timestamps:
-            if pos >= original_start and first_ts is None:
-                first_ts = start
-            if pos <= original_end:
-                last_ts = end
 
-        if first_ts is None and srt_timestamps:
-            first_ts = srt_timestamps[0][1]
-        if last_ts is None and srt_timestamps:
-            last_ts = srt_timestamps[-1][2]
+def segment_with_srt_timestamps(
+    text: str,
+    min_spaces: int = 50,
+    max_spaces: int = 60
+) -> List[str]:
+    """
+    分段并保留 SRT 时间戳范围
 
-        time_range = format_time_range(first_ts, last_ts)
-        results.append(f"{time_range}\n{segment}")
+    参数:
+        text: 原始文本（包含 SRT 时间戳）
+        min_spaces: 每段最少空格数
+        max_spaces: 每段最多空格数
 
-    return results
+    返回:
+        带时间范围的段落列表
+    """
+    return list(iter_segments_with_srt_timestamps(text, min_spaces, max_spaces))
 
 
 def segment_markdown_smart(
@@ -641,38 +941,26 @@ def segment_markdown_smart(
 
 # ============ SRT 格式处理模块 ============
 
-def load_srt_file(file_path: str) -> pysrt.SubRipFile:
+def load_srt_file(file_path: str) -> "pysrt.SubRipFile":
     """加载SRT文件，自动检测编码，处理 BOM"""
-    # 先尝试读取并去除 BOM
+    import pysrt
+
+    # 一次读入内存，去除 BOM 后直接在内存中解码解析，不经过临时文件
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    # 去除 UTF-8 BOM (如果存在)
+    if content.startswith(b'\xef\xbb\xbf'):
+        content = content[3:]
+
     try:
-        with open(file_path, 'rb') as f:
-            content = f.read()
-        # 去除 UTF-8 BOM (如果存在)
-        if content.startswith(b'\xef\xbb\xbf'):
-            content = content[3:]
-        # 创建临时文件处理
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.srt', delete=False) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-        # 使用临时文件
-        result = pysrt.open(tmp_path, encoding='utf-8')
-        import os
-        os.unlink(tmp_path)
-        return result
-    except Exception:
-        # 回退到原有逻辑
-        encodings = ('utf-8', 'iso-8859-1')
-        for encoding in encodings:
-            try:
-                return pysrt.open(file_path, encoding=encoding)
-            except (UnicodeDecodeError, LookupError):
-                continue
-        # 最后尝试
-        return pysrt.open(file_path, encoding='iso-8859-1', errors='replace')
+        text = content.decode('utf-8')
+    except UnicodeDecodeError:
+        # iso-8859-1 可解码任意字节，作为回退
+        text = content.decode('iso-8859-1')
+    return pysrt.from_string(text, error_handling=pysrt.SubRipFile.ERROR_PASS)
 
 
-def srt_time_to_seconds(time_obj: pysrt.SubRipTime) -> float:
+def srt_time_to_seconds(time_obj: "pysrt.SubRipTime") -> float:
     """将 pysrt SubRipTime 对象转换为秒数"""
     return (
         time_obj.hours * 3600 +
@@ -697,13 +985,13 @@ def process_srt_plain(file_path: str) -> str:
     return normalize_whitespace(' '.join(texts))
 
 
-def process_srt_with_time(
+def iter_srt_with_time(
     file_path: str,
     min_spaces: int = 50,
     max_spaces: int = 60
-) -> List[str]:
+) -> Iterator[str]:
     """
-    SRT → 带时间范围的分段
+    SRT → 逐段生成带时间范围的段落
 
     参数:
         file_path: SRT文件路径
@@ -711,54 +999,67 @@ def process_srt_with_time(
         max_spaces: 每段最多空格数
 
     返回:
-        带时间范围的段落列表
+        段落生成器，每项为 "时间范围\\n段落内容"
     """
     subs = load_srt_file(file_path)
 
-    # 构建文本和字幕边界映射
-    all_texts = []
-    sub_boundaries: List[int] = []
-    current_length = 0
+    # 构建文本和字幕边界映射：边界为每条字幕（含其后分隔空格）的累计结束位置，
+    # 最后一条字幕后没有空格，因此末尾边界减一，恰好等于全文长度
+    all_texts = [sub.text.replace('\n', ' ') for sub in subs]
+    sub_boundaries: List[int] = list(accumulate(len(text) + 1 for text in all_texts))
+    if sub_boundaries:
+        sub_boundaries[-1] -= 1
 
-    for sub in subs:
-        text = sub.text.replace('\n', ' ')
-        all_texts.append(text)
-        current_length += len(text) + 1  # +1 for space
-        sub_boundaries.append(current_length)
+    # 预先换算每条字幕的起止秒数，分段循环中只做下标访问
+    start_seconds = [srt_time_to_seconds(sub.start) for sub in subs]
+    end_seconds = [srt_time_to_seconds(sub.end) for sub in subs]
 
     full_text = ' '.join(all_texts)
     segments = segment_text_by_spaces(full_text, min_spaces, max_spaces)
-    results: List[str] = []
+    sub_count = len(sub_boundaries)
 
     for start_idx, end_idx in segments:
         segment = full_text[start_idx:end_idx].strip()
         if not segment:
             continue
 
-        # 找到第一个字幕：边界 > start_idx 的字幕
+        # 第一个字幕：边界 > start_idx 的字幕
         first_ts = None
-        for boundary_idx, boundary in enumerate(sub_boundaries):
-            if boundary > start_idx:
-                first_ts = srt_time_to_seconds(subs[boundary_idx].start)
-                break
+        i = bisect_right(sub_boundaries, start_idx)
+        if i < sub_count:
+            first_ts = start_seconds[i]
+        elif sub_count:
+            first_ts = start_seconds[0]
 
-        # 找到最后一个字幕：边界 >= end_idx 的字幕
+        # 最后一个字幕：边界 >= end_idx 的字幕
         last_ts = None
-        for boundary_idx, boundary in enumerate(sub_boundaries):
-            if boundary >= end_idx:
-                last_ts = srt_time_to_seconds(subs[boundary_idx].end)
-                break
-        else:
-            if subs:
-                last_ts = srt_time_to_seconds(subs[-1].end)
-
-        if first_ts is None and subs:
-            first_ts = srt_time_to_seconds(subs[0].start)
+        j = bisect_left(sub_boundaries, end_idx)
+        if j < sub_count:
+            last_ts = end_seconds[j]
+        elif sub_count:
+            last_ts = end_seconds[-1]
 
         time_range = format_time_range(first_ts, last_ts)
-        results.append(f"{time_range}\n{segment}")
+        yield f"{time_range}\n{segment}"
 
-    return results
+
+def process_srt_with_time(
+    file_path: str,
+    min_spaces: int = 50,
+    max_spaces: int = 60
+) -> List[str]:
+    """
+    SRT → 带时间范围的分段
+
+    参数:
+        file_path: SRT文件路径
+        min_spaces: 每段最少空格数
+        max_spaces: 每段最多空格数
+
+    返回:
+        带时间范围的段落列表
+    """
+    return list(iter_srt_with_time(file_path, min_spaces, max_spaces))
 
 
 def process_srt_slice(
@@ -800,27 +1101,34 @@ def process_srt_slice(
 
 def save_plain_text(text: str, output_path: Path, input_name: str) -> None:
     """保存纯文本输出"""
+    output_path.write_text(
+        f"{_SEP60}\n"
+        f"纯文本提取\n"
+        f"{_SEP60}\n\n"
+        f"{text}"
+        f"\n\n{_SEP60}\n"
+        f"处理完成\n"
+        f"{_SEP60}\n"
+        f"总字符数: {len(text)}\n"
+        f"源文件: {input_name}\n",
+        encoding='utf-8'
+    )
+
+
+def save_with_time_segments(segments: Iterable[str], output_path: Path) -> int:
+    """
+    保存带时间范围的分段
+
+    segments 可以是生成器：边生成边写入缓冲区，不在内存中保留全部段落
+
+    返回:
+        写入的段落数
+    """
+    count = 0
     with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(f"{'='*60}\n")
-        f.write(f"纯文本提取\n")
-        f.write(f"{'='*60}\n\n")
-        f.write(text)
-        f.write(f"\n\n{'='*60}\n")
-        f.write(f"处理完成\n")
-        f.write(f"{'='*60}\n")
-        f.write(f"总字符数: {len(text)}\n")
-        f.write(f"源文件: {input_name}\n")
-
-
-def save_with_time_segments(segments: List[str], output_path: Path) -> None:
-    """保存带时间范围的分段"""
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for i, segment in enumerate(segments, 1):
-            f.write(f"{'='*60}\n")
-            f.write(f"段落 {i}\n")
-            f.write(f"{'='*60}\n")
-            f.write(segment)
-            f.write("\n\n")
+        for count, segment in enumerate(segments, 1):
+            f.write(f"{_SEP60}\n段落 {count}\n{_SEP60}\n{segment}\n\n")
+    return count
 
 
 def save_sliced_content(
@@ -831,24 +1139,24 @@ def save_sliced_content(
     end_time: str
 ) -> None:
     """保存切片内容"""
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(f"{'='*60}\n")
-        f.write(f"字幕切片\n")
-        f.write(f"{'='*60}\n")
-        f.write(f"时间范围: {time_range}\n")
-        f.write(f"原始范围: {start_time} --> {end_time}\n")
-        f.write(f"\n{'='*60}\n")
-        f.write(f"内容\n")
-        f.write(f"{'='*60}\n\n")
-
-        for segment in segments:
-            f.write(segment)
-            f.write("\n\n")
-
-        f.write(f"{'='*60}\n")
-        f.write(f"处理完成\n")
-        f.write(f"{'='*60}\n")
-        f.write(f"切片字幕数: {len(segments)}\n")
+    parts = [
+        f"{_SEP60}\n"
+        f"字幕切片\n"
+        f"{_SEP60}\n"
+        f"时间范围: {time_range}\n"
+        f"原始范围: {start_time} --> {end_time}\n"
+        f"\n{_SEP60}\n"
+        f"内容\n"
+        f"{_SEP60}\n\n"
+    ]
+    parts.extend(f"{segment}\n\n" for segment in segments)
+    parts.append(
+        f"{_SEP60}\n"
+        f"处理完成\n"
+        f"{_SEP60}\n"
+        f"切片字幕数: {len(segments)}\n"
+    )
+    output_path.write_text(''.join(parts), encoding='utf-8')
 
 
 # ============ 统一处理接口 ============
@@ -875,16 +1183,16 @@ def process_timestamp_with_time(
     print(f"原始文本长度: {len(content)} 字符")
 
     # 检测是哪种时间戳格式
-    if re.search(SRT_TIMESTAMP_PATTERN, content[:2000]):
+    if _SRT_TIMESTAMP_RE.search(content, 0, 2000):
         print("检测到 SRT 时间戳格式")
-        segments = segment_with_srt_timestamps(content, min_spaces, max_spaces)
+        segments = iter_segments_with_srt_timestamps(content, min_spaces, max_spaces)
     else:
         print("检测到标准时间戳格式")
-        segments = segment_with_time_ranges(content, min_spaces, max_spaces)
+        segments = iter_segments_with_time_ranges(content, min_spaces, max_spaces)
 
     output_path = output_dir / f"{stem}_with_time.txt"
-    save_with_time_segments(segments, output_path)
-    print(f"生成了 {len(segments)} 个段落")
+    segment_count = save_with_time_segments(segments, output_path)
+    print(f"生成了 {segment_count} 个段落")
     print(f"\n已保存输出文件: {output_path}")
 
 
@@ -909,10 +1217,10 @@ def process_srt_by_mode(
 
     elif mode == "with-time":
         print(f"\n模式: 保留时间范围分段 (每段 {min_spaces}-{max_spaces} 个空格)")
-        segments = process_srt_with_time(file_path, min_spaces, max_spaces)
+        segments = iter_srt_with_time(file_path, min_spaces, max_spaces)
         output_path = output_dir / f"{stem}_with_time.txt"
-        save_with_time_segments(segments, output_path)
-        print(f"生成了 {len(segments)} 个段落")
+        segment_count = save_with_time_segments(segments, output_path)
+        print(f"生成了 {segment_count} 个段落")
         print(f"\n已保存输出文件: {output_path}")
 
     else:  # mode == "slice"
@@ -950,8 +1258,8 @@ def process_plain_text_by_mode(
         print(f"\n模式: 分段处理 (每段 {min_spaces}-{max_spaces} 个空格)")
         segments = segment_by_spaces(clean_text, min_spaces, max_spaces)
         output_path = output_dir / f"{stem}_with_time.txt"
-        save_with_time_segments(segments, output_path)
-        print(f"生成了 {len(segments)} 个段落")
+        segment_count = save_with_time_segments(segments, output_path)
+        print(f"生成了 {segment_count} 个段落")
         print(f"\n已保存输出文件: {output_path}")
 
     else:  # mode == "slice"
@@ -1040,6 +1348,31 @@ class Args:
         self.end_time = end_time
 
 
+class _ArgumentParser(argparse.ArgumentParser):
+    """使用自定义中文帮助和错误提示的参数解析器"""
+    def format_help(self) -> str:
+        return _HELP_TEXT + '\n'
+
+    def error(self, message: str) -> NoReturn:
+        print(f"错误: {message}")
+        print("使用 --help 查看帮助信息")
+        sys.exit(1)
+
+
+@lru_cache(maxsize=1)
+def _build_parser() -> _ArgumentParser:
+    """构建命令行解析器（首次调用时构建一次）"""
+    parser = _ArgumentParser(prog='preprocessor.py', add_help=False)
+    parser.add_argument('-h', '--help', action='help')
+    parser.add_argument('input_path')
+    parser.add_argument('--mode', choices=('plain', 'with-time', 'slice'), default='with-time')
+    parser.add_argument('--min', dest='min_spaces', type=int, default=50)
+    parser.add_argument('--max', dest='max_spaces', type=int, default=60)
+    parser.add_argument('--start', dest='start_time')
+    parser.add_argument('--end', dest='end_time')
+    return parser
+
+
 def parse_arguments() -> Args:
     """
     解析命令行参数
@@ -1051,85 +1384,16 @@ def parse_arguments() -> Args:
         print_help()
         sys.exit(0)
 
-    if sys.argv[1] in ('-h', '--help'):
-        print_help()
-        sys.exit(0)
-
-    input_path = sys.argv[1]
-    mode: ProcessMode = "with-time"
-    min_spaces = 50
-    max_spaces = 60
-    start_time: Optional[str] = None
-    end_time: Optional[str] = None
-
-    i = 2
-    while i < len(sys.argv):
-        arg = sys.argv[i]
-
-        if arg == '--mode':
-            if i + 1 >= len(sys.argv):
-                print("错误: --mode 需要指定模式")
-                sys.exit(1)
-            mode_val = sys.argv[i + 1]
-            if mode_val in ('plain', 'with-time', 'slice'):
-                mode = mode_val
-            else:
-                print(f"错误: 无效的模式 '{mode_val}'")
-                print("可用模式: plain, with-time, slice")
-                sys.exit(1)
-            i += 2
-
-        elif arg == '--min':
-            if i + 1 >= len(sys.argv):
-                print("错误: --min 需要指定数量")
-                sys.exit(1)
-            try:
-                min_spaces = int(sys.argv[i + 1])
-            except ValueError:
-                print(f"错误: --min 需要整数，得到 '{sys.argv[i + 1]}'")
-                sys.exit(1)
-            i += 2
-
-        elif arg == '--max':
-            if i + 1 >= len(sys.argv):
-                print("错误: --max 需要指定数量")
-                sys.exit(1)
-            try:
-                max_spaces = int(sys.argv[i + 1])
-            except ValueError:
-                print(f"错误: --max 需要整数，得到 '{sys.argv[i + 1]}'")
-                sys.exit(1)
-            i += 2
-
-        elif arg == '--start':
-            if i + 1 >= len(sys.argv):
-                print("错误: --start 需要指定时间")
-                sys.exit(1)
-            start_time = sys.argv[i + 1]
-            i += 2
-
-        elif arg == '--end':
-            if i + 1 >= len(sys.argv):
-                print("错误: --end 需要指定时间")
-                sys.exit(1)
-            end_time = sys.argv[i + 1]
-            i += 2
-
-        else:
-            print(f"错误: 未知参数 '{arg}'")
-            print("使用 --help 查看帮助信息")
-            sys.exit(1)
-
-    return Args(input_path, mode, min_spaces, max_spaces, start_time, end_time)
+    return Args(**vars(_build_parser().parse_args()))
 
 
 # ============ 主程序 ============
 
 def main() -> None:
     """主程序入口"""
-    print("=" * 60)
+    print(_SEP60)
     print("通用文本处理器 v1.0")
-    print("=" * 60)
+    print(_SEP60)
 
     try:
         args = parse_arguments()
@@ -1153,7 +1417,7 @@ def main() -> None:
         elif args.mode == 'slice':
             print(f"  切片范围: {args.start_time} --> {args.end_time}")
 
-        print("\n" + "-" * 60)
+        print(f"\n{_DASH60}")
 
         process_file(
             args.input_path,
@@ -1165,9 +1429,9 @@ def main() -> None:
             args.end_time
         )
 
-        print("\n" + "=" * 60)
+        print(f"\n{_SEP60}")
         print("处理完成!")
-        print("=" * 60)
+        print(_SEP60)
 
     except FileNotFoundError as e:
         print(f"\n错误: {e}")
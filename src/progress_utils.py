@@ -12,10 +12,19 @@ import os
 PROGRESS_MARKER_PREFIX = "<!-- PROCESSING: segment="
 PROGRESS_MARKER_SUFFIX = "-->"
 
+TAIL_PROBE_SIZE = 1024          # 读取文件末尾查找进度标记的字节数
+SEPARATOR_SCAN_CHUNK = 64 * 1024  # 无标记时反向统计段落分隔符的块大小
+MARKER_SCAN_CHUNK = 4096        # 反向查找末尾标记行时每次读取的字节数
+
 
 # ============ 进度标记操作 ============
 
-def make_progress_marker(segment_index: int, total: int, status: str) -> str:
+def make_progress_marker(
+    segment_index: int,
+    total: int,
+    status: str,
+    offset: int | None = None,
+) -> str:
     """
     创建进度标记
 
@@ -23,14 +32,16 @@ def make_progress_marker(segment_index: int, total: int, status: str) -> str:
         segment_index: 当前段落索引
         total: 总段落数
         status: 状态 ("processing", "complete", "failed")
+        offset: 可选，标记之前已写入内容的字节长度（即标记所在行前换行符的位置）
 
     返回:
         进度标记字符串
     """
-    return f"{PROGRESS_MARKER_PREFIX}{segment_index}/{total}, status={status} {PROGRESS_MARKER_SUFFIX}"
+    offset_part = f", offset={offset}" if offset is not None else ""
+    return f"{PROGRESS_MARKER_PREFIX}{segment_index}/{total}, status={status}{offset_part} {PROGRESS_MARKER_SUFFIX}"
 
 
-def parse_progress_marker(content: str) -> tuple[int, int, str] | None:
+def parse_progress_marker(content: str) -> tuple[int, int, str, int | None] | None:
     """
     解析进度标记
 
@@ -38,7 +49,8 @@ def parse_progress_marker(content: str) -> tuple[int, int, str] | None:
         content: 文件内容（从末尾读取的部分内容）
 
     返回:
-        (index, total, status) 元组，如果未找到标记则返回 None
+        (index, total, status, offset) 元组，如果未找到标记则返回 None；
+        旧版标记没有 offset 字段，此时 offset 为 None
     """
     lines = content.strip().split('\n')
     for line in reversed(lines):
@@ -51,13 +63,16 @@ def parse_progress_marker(content: str) -> tuple[int, int, str] | None:
                 status_part = parts[1] if len(parts) > 1 else "processing"
                 index, total = segment_part.split('/')
                 status = status_part.split('=')[1].strip() if '=' in status_part else "processing"
-                return int(index), int(total), status
+                offset = None
+                if len(parts) > 2 and parts[2].startswith('offset='):
+                    offset = int(parts[2][len('offset='):].strip())
+                return int(index), int(total), status, offset
             except (ValueError, IndexError):
                 continue
     return None
 
 
-def load_progress(output_path: str, total_segments: int) -> tuple[int, str]:
+def load_progress(output_path: str, total_segments: int) -> tuple[int, str, int | None]:
     """
     检查输出文件的进度标记
 
@@ -66,35 +81,89 @@ def load_progress(output_path: str, total_segments: int) -> tuple[int, str]:
         total_segments: 总段落数
 
     返回:
-        (start_index, status) - 开始处理的段落索引和状态
+        (start_index, status, offset) - 开始处理的段落索引、状态和标记记录的内容末尾字节位置
         status: "new", "processing", "complete", "failed", "unknown"
+        offset: 仅 processing/failed 且标记带 offset 字段时有值，否则为 None
     """
-    if not os.path.exists(output_path):
-        return 0, "new"
+    # 单次 stat 同时判断文件是否存在并取得大小
+    try:
+        file_size = os.stat(output_path).st_size
+    except FileNotFoundError:
+        return 0, "new", None
 
-    # 读取文件末尾 1KB（优化性能）
+    # 读取文件末尾 1KB（优化性能），文件保持打开供无标记时的反向统计复用
     with open(output_path, 'rb') as f:
-        f.seek(max(0, os.path.getsize(output_path) - 1024))
-        tail_content = f.read().decode('utf-8', errors='ignore')
-
-    marker = parse_progress_marker(tail_content)
-    if marker is None:
-        # 无标记：检查文件是否有内容
-        with open(output_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-        if content:
-            # 有内容但无标记：可能是旧版本文件，尝试用旧方法估算
-            estimated = content.count('\n\n') + 1
-            return min(estimated, total_segments), "unknown"
-        return 0, "new"
-
-    index, total, status = marker
+        tail_start = max(0, file_size - TAIL_PROBE_SIZE)
+        if hasattr(os, 'pread'):
+            tail_bytes = os.pread(f.fileno(), TAIL_PROBE_SIZE, tail_start)
+        else:
+            f.seek(tail_start)
+            tail_bytes = f.read()
+        tail_content = tail_bytes.decode('utf-8', errors='ignore')
+
+        marker = parse_progress_marker(tail_content)
+        if marker is None:
+            # 无标记：可能是旧版本文件，按段落分隔符估算进度
+            separators = count_separators_backward(f, file_size, max(total_segments - 1, 0))
+            if separators is None:
+                return 0, "new", None
+            return min(separators + 1, total_segments), "unknown", None
+
+    index, total, status, offset = marker
     if status == "complete":
-        return total_segments, "complete"
+        return total_segments, "complete", None
     if status == "failed":
-        return index, "failed"
+        return index, "failed", offset
     # processing 状态：标记显示正在处理中，可能需要重试当前段落
-    return index, "processing"
+    return index, "processing", offset
+
+
+def count_separators_backward(f, file_size: int, limit: int) -> int | None:
+    """
+    从文件末尾向前分块统计段落分隔符（连续两个换行符）的数量
+
+    结果与对去除首尾空白后的全文统计分隔符一致，但只读取必要的部分：
+    统计数达到 limit 后即停止。
+
+    参数:
+        f: 以二进制模式打开的文件
+        file_size: 文件大小
+        limit: 统计上限
+
+    返回:
+        分隔符数量（达到上限时为 limit）；文件只有空白时返回 None
+    """
+    count = 0
+    carry = b''        # 较后一块开头的空白，可能与前一块末尾相连，留到下一轮一起统计
+    in_tail = True     # 仍处于文件末尾的空白中（对应 strip 去掉的部分）
+    pos = file_size
+
+    while pos > 0:
+        read_size = min(SEPARATOR_SCAN_CHUNK, pos)
+        pos -= read_size
+        f.seek(pos)
+        chunk = f.read(read_size) + carry
+
+        if in_tail:
+            chunk = chunk.rstrip()
+            if not chunk:
+                carry = b''
+                continue
+            in_tail = False
+
+        if pos == 0:
+            body, carry = chunk.lstrip(), b''
+        else:
+            body = chunk.lstrip()
+            carry = chunk[:len(chunk) - len(body)]
+
+        count += body.count(b'\n\n')
+        if count >= limit:
+            return limit
+
+    if in_tail:
+        return None
+    return count
 
 
 # ============ 文件标记清理工具 ============
@@ -114,6 +183,55 @@ def remove_trailing_markers(lines: list[str]) -> list[str]:
     return lines
 
 
+def truncate_markers_at(file_handle, offset: int) -> None:
+    """
+    在内容末尾位置截断文件，删除其后的所有进度标记
+
+    参数:
+        file_handle: 已打开的文件句柄（读写模式）
+        offset: 内容末尾的字节位置（标记所在行之前换行符的位置）
+    """
+    file_handle.seek(offset)
+    file_handle.truncate()
+
+
+def find_trailing_markers_offset(f, file_size: int) -> int:
+    """
+    从文件末尾向前查找末尾标记行的起始位置，只读取末尾若干字节
+
+    结果与 remove_trailing_markers 对全文按行处理后重新拼接的内容长度一致，
+    可直接传给 truncate_markers_at。
+
+    参数:
+        f: 以二进制模式打开的文件
+        file_size: 文件大小
+
+    返回:
+        删除末尾标记行后内容末尾的字节位置（没有标记时为 file_size）
+    """
+    end = file_size      # 当前最后一行的末尾
+    buf = b''            # 文件 [buf_start, end) 部分
+    buf_start = file_size
+
+    while True:
+        newline = buf.rfind(b'\n')
+        if newline < 0 and buf_start > 0:
+            # 缓冲区中没有完整的行，继续向前读取
+            read_start = max(0, buf_start - MARKER_SCAN_CHUNK)
+            f.seek(read_start)
+            buf = f.read(buf_start - read_start) + buf
+            buf_start = read_start
+            continue
+
+        line = buf[newline + 1:]
+        if not line.decode('utf-8', errors='ignore').strip().startswith(PROGRESS_MARKER_PREFIX):
+            return end
+        if newline < 0:
+            return 0  # 整个文件都是标记行
+        end = buf_start + newline
+        buf = buf[:newline]
+
+
 def rewrite_file_without_marker(file_handle, content: str) -> None:
     """
     读取文件内容，删除末尾标记，重新写入
@@ -121,10 +239,11 @@ def rewrite_file_without_marker(file_handle, content: str) -> None:
     参数:
         file_handle: 已打开的文件句柄（读写模式）
         content: 当前文件内容
+
+    不主动 flush：由调用方在写入后续内容后统一 flush，需要落盘保证时可再调用 os.fsync
     """
     lines = content.split('\n')
     lines = remove_trailing_markers(lines)
     file_handle.seek(0)
     file_handle.truncate()
     file_handle.write('\n'.join(lines))
-    file_handle.flush()
@@ -4,25 +4,36 @@
 提供通用的流式写入和处理功能
 """
 
-from collections.abc import Callable
+import os
+import sys
+from collections import deque
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Literal
 
 from openai import OpenAI
 
 from progress_utils import (
+    PROGRESS_MARKER_PREFIX,
     make_progress_marker,
-    remove_trailing_markers,
+    truncate_markers_at,
+    find_trailing_markers_offset,
 )
 from api_utils import call_deepseek_api
+from api_batch import run_resumable_batch_jobs
 
 
 def process_segments_streaming(
     client: OpenAI,
     system_prompt: str,
-    segments: list[str],
+    segments: Sequence[str],
     output_path: str,
     start_index: int = 0,
     start_status: str = "new",
     content_transformer: Callable[[str, int], str] | None = None,
+    mode: Literal["sync", "batch"] = "sync",
+    max_concurrency: int = 1,
+    start_offset: int | None = None,
 ) -> None:
     """
     流式处理段落并立即写入文件（支持进度标记）
@@ -35,24 +46,23 @@ def process_segments_streaming(
         start_index: 开始处理的段落索引
         start_status: 起始状态 ("new", "processing", "failed")
         content_transformer: 可选的内容转换函数，接收 (segment, index) 返回用于 API 的内容
-
-    每处理完一个段落立即写入文件并 flush，确保容错性
+        mode: "sync" 逐段实时调用；"batch" 通过 Batch 接口一次性提交剩余段落（延迟高、成本低），
+            批量任务 ID 保存在 "<output_path>.batch.json"，中断后重新运行会继续等待同一批量任务
+        max_concurrency: sync 模式下同时进行的 API 请求数，结果仍按段落顺序写入（默认 1 即逐段串行）
+        start_offset: 续传时进度标记记录的内容末尾字节位置（load_progress 返回），
+            有效时直接在此截断；旧版标记没有该字段，传 None 时从文件末尾查找标记
+
+    每处理完一个段落写入结果和下一段的处理标记后 flush 一次，确保容错性；
+    其余写入依赖文件缓冲，文件关闭时写出
+
+    并发模式下中断（如 Ctrl-C）时，尚未开始的请求会被取消，但已发出的请求无法中止：
+    解释器退出前会等待工作线程结束，最长约为 HTTP 读取超时（api_utils.HTTP_READ_TIMEOUT，
+    默认 600 秒）乘以重试次数。已写入文件的段落不受影响，重新运行会从中断处继续
     """
     total = len(segments)
+    batch_state_path = f"{output_path}.batch.json"
     file_handle = None
-
-    def read_and_remove_marker(handle, content: str) -> list[str]:
-        """读取文件内容，去掉末尾标记"""
-        lines = content.split('\n')
-        lines = remove_trailing_markers(lines)
-        return lines
-
-    def write_lines(handle, lines: list[str]) -> None:
-        """将行列表写入文件"""
-        handle.seek(0)
-        handle.truncate()
-        handle.write('\n'.join(lines))
-        handle.flush()
+    executor = None
 
     def prepare_segment_content(segment: str, index: int) -> str:
         """准备用于 API 调用的内容"""
@@ -60,99 +70,137 @@ def process_segments_streaming(
             return content_transformer(segment, index)
         return segment
 
-    try:
-        # 根据起始状态决定文件模式
-        mode = 'w+' if start_status == "new" else 'r+'
-        file_handle = open(output_path, mode, encoding='utf-8')
+    def fetch_segment(index: int) -> str:
+        """调用 API 处理单个段落"""
+        return call_deepseek_api(client, system_prompt, prepare_segment_content(segments[index], index))
 
-        # 如果不是从头开始，需要删除末尾的旧标记
-        if start_index > 0 and start_status in ("processing", "failed"):
-            rewrite_file_without_marker(file_handle, file_handle.read())
+    try:
+        # content_end：已写入内容的末尾字节位置，其后只会跟随一个进度标记。
+        # 每段只在此处截断旧标记并追加，不再读回和重写整个文件
+        if start_status == "new":
+            content_end = 0
+        else:
+            # 续传：优先使用标记记录的位置，否则只读取文件末尾定位旧标记
+            with open(output_path, 'rb') as f:
+                if _is_marker_offset(f, start_offset):
+                    content_end = start_offset
+                else:
+                    content_end = find_trailing_markers_offset(f, os.fstat(f.fileno()).st_size)
+
+        # 根据起始状态决定文件模式；newline='' 关闭换行符转换，保证写入字节数与 content_end 一致
+        file_mode = 'w+' if start_status == "new" else 'r+'
+        file_handle = open(output_path, file_mode, encoding='utf-8', newline='')
+        if start_status != "new":
+            truncate_markers_at(file_handle, content_end)
+
+        # 批量模式：先提交所有剩余段落并等待结果，再按顺序写入
+        batch_results = None
+        if mode == "batch":
+            jobs = [
+                (system_prompt, prepare_segment_content(segments[i], i))
+                for i in range(start_index, total)
+            ]
+            batch_results = run_resumable_batch_jobs(client, jobs, batch_state_path)
+
+        # 并发模式：滑动窗口内最多 max_concurrency 个请求同时进行，
+        # 按提交顺序取结果写入，处理标记始终指向仍在等待的最小段落
+        pending: deque[Future[str]] = deque()
+        if batch_results is None and max_concurrency > 1:
+            executor = ThreadPoolExecutor(max_workers=max_concurrency)
+            for j in range(start_index, min(start_index + max_concurrency, total)):
+                pending.append(executor.submit(fetch_segment, j))
+
+        # 写入第一个待处理段落的处理标记；之后每段的标记随上一段结果一起写入，
+        # 每段只 flush 一次，磁盘上始终是“已完成内容 + 当前段处理标记”
+        if start_index < total:
+            file_handle.write(f"\n{make_progress_marker(start_index, total, 'processing', content_end)}")
+            file_handle.flush()
 
         for i in range(start_index, total):
-            print(f"\n正在处理段落 {i + 1}/{total}...")
-
-            # 写入当前处理标记
-            file_handle.write(f"\n{make_progress_marker(i, total, 'processing')}")
-            file_handle.flush()
+            # 进度信息直接写入 stdout 缓冲区，每段与输出文件一起只 flush 一次
+            sys.stdout.write(f"\n正在处理段落 {i + 1}/{total}...\n")
 
             try:
-                user_content = prepare_segment_content(segments[i], i)
-                result = call_deepseek_api(client, system_prompt, user_content)
-
-                # 删除标记并写入结果
-                # 如果是第一个段落且是新文件，直接写入结果（无需读取）
-                if i == 0 and start_status == "new":
-                    lines = []
+                if batch_results is not None:
+                    result = batch_results[i - start_index]
+                    if isinstance(result, BaseException):
+                        raise result
+                elif executor is not None:
+                    future = pending.popleft()
+                    if i + max_concurrency < total:
+                        pending.append(executor.submit(fetch_segment, i + max_concurrency))
+                    result = future.result()
                 else:
-                    # 修复：在读取前重置文件指针到文件开头
-                    file_handle.seek(0)
-                    lines = read_and_remove_marker(file_handle, file_handle.read())
+                    result = fetch_segment(i)
 
-                # 添加段落分隔符和内容
-                if i > 0 or lines:
-                    lines.append("")
-                lines.append(result)
-
-                write_lines(file_handle, lines)
-                print(f"  段落 {i + 1} 处理完成")
+                # 删除标记并追加结果（已有内容时以空行分隔）
+                text = f"\n\n{result}" if content_end else result
+                truncate_markers_at(file_handle, content_end)
+                file_handle.write(text)
+                content_end += _encoded_len(text)
+                sys.stdout.write(f"  段落 {i + 1} 处理完成\n")
 
             except Exception as e:
-                print(f"  段落 {i + 1} 处理失败: {e}")
-                handle_segment_failure(file_handle, i, total, segments[i])
+                sys.stdout.write(f"  段落 {i + 1} 处理失败: {e}\n")
+                content_end = handle_segment_failure(file_handle, content_end, i, total, segments[i])
+
+            # 写入下一段的处理标记，本段唯一一次 flush
+            if i + 1 < total:
+                file_handle.write(f"\n{make_progress_marker(i + 1, total, 'processing', content_end)}")
+            file_handle.flush()
+            sys.stdout.flush()
 
-        # 所有段落处理完成，标记完成
-        write_completion_marker(file_handle, total)
+        # 所有段落处理完成，标记完成（文件在 finally 中关闭时写出缓冲区）
+        write_completion_marker(file_handle, content_end, total)
+
+        # 批量结果已全部写入，不再需要续等状态
+        if mode == "batch":
+            try:
+                os.remove(batch_state_path)
+            except FileNotFoundError:
+                pass
 
     finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
         if file_handle:
             file_handle.close()
 
 
-def rewrite_file_without_marker(file_handle, content: str) -> None:
-    """读取文件内容，删除末尾标记，重新写入"""
-    lines = content.split('\n')
-    lines = remove_trailing_markers(lines)
-    file_handle.seek(0)
-    file_handle.truncate()
-    file_handle.write('\n'.join(lines))
-    file_handle.flush()
-
-
-def handle_segment_failure(file_handle, index: int, total: int, segment: str) -> None:
-    """处理段落失败的情况"""
-    # 读取当前内容并删除处理标记
-    file_handle.seek(0)
-    content = file_handle.read()
-    lines = content.split('\n')
-    lines = remove_trailing_markers(lines)
-
-    # 写入失败标记
-    lines.append(make_progress_marker(index, total, "failed"))
-    file_handle.seek(0)
-    file_handle.truncate()
-    file_handle.write('\n'.join(lines))
-    file_handle.flush()
-
-    # 写入失败内容
-    if len(lines) > 1:
-        file_handle.write("\n\n")
-    file_handle.write(f"[处理失败，保留原文]\n\n{segment}")
-    file_handle.flush()
-
-
-def write_completion_marker(file_handle, total: int) -> None:
-    """写入完成标记"""
+def _encoded_len(text: str) -> int:
+    """文本写入文件后占用的字节数（文件以 UTF-8 打开）"""
+    return len(text.encode('utf-8'))
+
+
+def _is_marker_offset(f, offset: int | None) -> bool:
+    """检查 offset 处是否正是标记行（换行符 + 标记前缀），防止文件被外部修改后截断到错误位置"""
+    if offset is None or offset < 0:
+        return False
+    expected = f"\n{PROGRESS_MARKER_PREFIX}".encode('utf-8')
+    f.seek(offset)
+    return f.read(len(expected)) == expected
+
+
+def handle_segment_failure(file_handle, content_end: int, index: int, total: int, segment: str) -> int:
+    """
+    处理段落失败的情况：在内容末尾截断处理标记，写入失败标记并保留原文
+
+    返回:
+        新的内容末尾字节位置
+    """
+    text = (
+        f"\n{make_progress_marker(index, total, 'failed', content_end)}"
+        f"\n\n[处理失败，保留原文]\n\n{segment}"
+    )
+    truncate_markers_at(file_handle, content_end)
+    file_handle.write(text)
+    return content_end + _encoded_len(text)
+
+
+def write_completion_marker(file_handle, content_end: int, total: int) -> None:
+    """在内容末尾写入完成标记（替换可能残留的处理标记）"""
     if file_handle is None:
         return
 
-    file_handle.seek(0)
-    content = file_handle.read()
-    lines = content.split('\n')
-    lines = remove_trailing_markers(lines)
-
-    file_handle.seek(0)
-    file_handle.truncate()
-    file_handle.write('\n'.join(lines))
-    file_handle.write(f"\n{make_progress_marker(total, total, 'complete')}")
-    file_handle.flush()
+    truncate_markers_at(file_handle, content_end)
+    file_handle.write(f"\n{make_progress_marker(total, total, 'complete', content_end)}")
@@ -4,11 +4,12 @@
 功能：支持带时间戳和纯文本两种输入格式，调用 DeepSeek API 进行两阶段摘要
 """
 
+import argparse
+import os
 import sys
+from collections.abc import Callable, Sequence
 from pathlib import Path
-from typing import Literal
-
-from openai import OpenAI
+from typing import TYPE_CHECKING, Literal, NoReturn
 
 from preprocessor import (
     segment_with_time_ranges,
@@ -17,21 +18,25 @@ from preprocessor import (
     segment_markdown_smart,
     normalize_whitespace,
     detect_file_format,
+    detect_text_format,
     process_srt_with_time,
+    read_text_mapped,
     FormatType,
     DEFAULT_MD_CHAR_LIMIT,
     DEFAULT_MD_PARAGRAPH_LIMIT,
 )
-from api_utils import create_client, call_deepseek_api
 from config_utils import initialize_project_setup, load_prompt
 from progress_utils import load_progress
-from streaming_processor import process_segments_streaming
+
+if TYPE_CHECKING:
+    from openai import OpenAI  # 运行时在实际调用 API 时才导入 api_utils/openai
 
 
 # ============ 配置常量 ============
 
 DEFAULT_MIN_SPACES = 50
 DEFAULT_MAX_SPACES = 60
+MAX_BUDGET_TOKENS: int | None = None  # 单次运行估算输入 token 上限，超出时在调用 API 前中止；None 表示不限制
 
 
 # ============ 格式检测与分段 ============
@@ -42,6 +47,7 @@ def adaptive_segment(
     max_spaces: int = DEFAULT_MAX_SPACES,
     char_limit: int = DEFAULT_MD_CHAR_LIMIT,
     paragraph_limit: int = DEFAULT_MD_PARAGRAPH_LIMIT,
+    format_type: FormatType | None = None,
 ) -> tuple[FormatType, list[str]]:
     """
     自适应分段：根据文本格式选择合适的分段方式
@@ -59,26 +65,16 @@ def adaptive_segment(
         max_spaces: 每段最多空格数
         char_limit: Markdown 字数限制（默认 5000）
         paragraph_limit: Markdown 段落数限制（默认 20）
+        format_type: 已检测出的格式（如 detect_file_format 的结果），提供时跳过文本格式检测
 
     返回:
         (format_type, segments)
         - format_type: "timestamp", "srt_timestamp", "srt", "markdown" 或 "plain"
         - segments: 分段后的文本列表
     """
-    import re
-
-    TIMESTAMP_PATTERN = r'\[\d+\.\d+s\s*-->\s*\d+\.\d+s\]'
-    SRT_TIMESTAMP_PATTERN = r'\[(\d{2}:\d{2}:\d{2}[,\.]\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2}[,\.]\d{3})\]'
-
-    # 检测格式
-    if re.search(SRT_TIMESTAMP_PATTERN, text):
-        format_type = "srt_timestamp"
-    elif re.search(r'^\d+\s*\n\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3}', text, re.MULTILINE):
-        format_type = "srt"
-    elif re.search(TIMESTAMP_PATTERN, text):
-        format_type = "timestamp"
-    else:
-        format_type = "plain"
+    # 检测格式（调用方已检测过时直接使用）
+    if format_type is None:
+        format_type = detect_text_format(text)
 
     # 根据格式分段
     if format_type == "markdown":
@@ -127,67 +123,90 @@ def extract_segment_content(segment: str, format_type: FormatType) -> str:
     return segment
 
 
-def create_content_transformer(format_type: FormatType):
+def create_content_transformer(
+    format_type: FormatType,
+    segments: Sequence[str],
+) -> Callable[[str, int], str] | None:
     """
     创建内容转换函数用于流式处理
 
+    所有段落的 API 内容在此一次性预先生成，转换函数只按索引取用，
+    流式处理循环中不再拆分和拼接字符串；失败时写入的仍是原始段落
+
     参数:
         format_type: 文本格式类型
+        segments: 分段文本列表
 
     返回:
-        转换函数
+        转换函数；内容无需转换的格式返回 None
     """
+    if format_type not in ("timestamp", "srt_timestamp", "srt"):
+        return None
+
+    prepared = [extract_segment_content(segment, format_type) for segment in segments]
+
     def transformer(segment: str, index: int) -> str:
-        return extract_segment_content(segment, format_type)
+        return prepared[index]
     return transformer
 
 
 # ============ 摘要合并模块 ============
 
-def build_merge_content(content: str, format_type: FormatType) -> str:
-    """
-    构造合并摘要的 prompt 内容
-
-    参数:
-        content: 各段落摘要内容
-        format_type: 文本格式类型
-
-    返回:
-        合并 prompt 的完整内容
+# 各格式合并 prompt 的固定前后缀，内容放在两者之间
+_TIMED_MERGE_PARTS = (
+    "以下是按时间顺序排列的各时段摘要：\n\n",
     """
-    if format_type in ("timestamp", "srt_timestamp", "srt"):
-        return f"""以下是按时间顺序排列的各时段摘要：
-
-{content}
 
 请将这些时段摘要整合成一篇完整的全文摘要，要求：
 1. 保持时间线逻辑，展示内容在不同时间段的发展
 2. 提炼核心主题和关键信息
 3. 使用清晰的段落结构
-4. 在适当位置引用时间范围"""
-    elif format_type == "markdown":
-        return f"""以下是 Markdown 文档的各片段摘要：
-
-{content}
+4. 在适当位置引用时间范围""",
+)
+_MARKDOWN_MERGE_PARTS = (
+    "以下是 Markdown 文档的各片段摘要：\n\n",
+    """
 
 请将这些片段摘要整合成一篇完整的全文摘要，要求：
 1. 提炼核心主题和关键信息
 2. 使用清晰的段落结构
 3. 保持内容的连贯性和逻辑性
-4. 保留 Markdown 文档的结构特点"""
-    # plain 格式
-    return f"""以下是各段落的摘要：
-
-{content}
+4. 保留 Markdown 文档的结构特点""",
+)
+_PLAIN_MERGE_PARTS = (
+    "以下是各段落的摘要：\n\n",
+    """
 
 请将这些段落摘要整合成一篇完整的全文摘要，要求：
 1. 提炼核心主题和关键信息
 2. 使用清晰的段落结构
-3. 保持内容的连贯性和逻辑性"""
+3. 保持内容的连贯性和逻辑性""",
+)
+
+
+def build_merge_content(content: str, format_type: FormatType) -> str:
+    """
+    构造合并摘要的 prompt 内容
+
+    参数:
+        content: 各段落摘要内容
+        format_type: 文本格式类型
+
+    返回:
+        合并 prompt 的完整内容
+    """
+    if format_type in ("timestamp", "srt_timestamp", "srt"):
+        prefix, suffix = _TIMED_MERGE_PARTS
+    elif format_type == "markdown":
+        prefix, suffix = _MARKDOWN_MERGE_PARTS
+    else:  # plain 格式
+        prefix, suffix = _PLAIN_MERGE_PARTS
+    # 一次性拼接，content 只复制一次
+    return ''.join((prefix, content, suffix))
 
 
 def merge_summaries(
-    client: OpenAI,
+    client: "OpenAI",
     merge_prompt: str,
     segments_path: str,
     output_path: str,
@@ -202,6 +221,9 @@ def merge_summaries(
         segments_path: 段落摘要文件路径
         output_path: 最终输出路径
         format_type: "timestamp", "srt_timestamp", "srt" 或 "plain"
+
+    异常:
+        ValueError: 合并请求预计超出模型上下文窗口
     """
     format_name = "时段" if format_type in ("timestamp", "srt_timestamp", "srt") else "段落"
     print(f"\n正在合并各{format_name}摘要...")
@@ -211,27 +233,82 @@ def merge_summaries(
 
     merge_content = build_merge_content(content, format_type)
 
+    from api_utils import CHARS_PER_TOKEN, MODEL_CONTEXT_TOKENS, call_deepseek_api
+
+    # 合并请求一次发送全部段落摘要，超出上下文窗口时 API 只会报错，提前中止并给出原因
+    estimated_tokens = (len(merge_prompt) + len(merge_content)) // CHARS_PER_TOKEN
+    if estimated_tokens > MODEL_CONTEXT_TOKENS:
+        raise ValueError(
+            f"合并请求预计约 {estimated_tokens} token，超出模型上下文上限 {MODEL_CONTEXT_TOKENS}，"
+            f"请增大分段大小以减少段落摘要数量，或手动精简 {segments_path} 后重试"
+        )
+
     print("正在生成最终全文摘要...")
     final_summary = call_deepseek_api(client, merge_prompt, merge_content)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(final_summary)
+    # 先写临时文件并落盘，再原子替换：进程中途退出时不会留下写了一半的最终摘要
+    tmp_path = f"{output_path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(final_summary)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
 
     print(f"  最终摘要已保存到: {output_path}")
 
 
+# ============ 额度预检 ============
+
+def check_token_budget(
+    segments: Sequence[str],
+    system_prompt: str,
+    max_tokens: int | None = MAX_BUDGET_TOKENS,
+) -> int:
+    """
+    估算处理这些段落所需的输入 token 数，超出预算时在开始调用 API 前报错
+
+    参数:
+        segments: 待处理的段落
+        system_prompt: 每次请求附带的系统提示词
+        max_tokens: token 预算上限，None 表示只估算不检查
+
+    返回:
+        估算的 token 数
+
+    异常:
+        ValueError: 估算值超出预算
+    """
+    from api_utils import CHARS_PER_TOKEN
+
+    total_chars = sum(map(len, segments)) + len(system_prompt) * len(segments)
+    estimated = total_chars // CHARS_PER_TOKEN
+    if max_tokens is not None and estimated > max_tokens:
+        raise ValueError(
+            f"预计需要约 {estimated} 个输入 token，超出预算 {max_tokens}，"
+            f"请调大 --max-tokens 或拆分输入文件"
+        )
+    return estimated
+
+
 # ============ 主处理流程 ============
 
 def process_summary(
     input_path: str,
     output_dir: Path,
-    client: OpenAI,
+    client: "OpenAI",
     summary_prompt: str,
     merge_prompt: str,
     min_spaces: int = DEFAULT_MIN_SPACES,
     max_spaces: int = DEFAULT_MAX_SPACES,
     char_limit: int = DEFAULT_MD_CHAR_LIMIT,
     paragraph_limit: int = DEFAULT_MD_PARAGRAPH_LIMIT,
+    max_budget_tokens: int | None = MAX_BUDGET_TOKENS,
+    mode: Literal["sync", "batch"] = "sync",
+    max_concurrency: int = 1,
 ) -> None:
     """
     完整的摘要处理流程
@@ -253,6 +330,9 @@ def process_summary(
         max_spaces: 每段最多空格数
         char_limit: Markdown 字数限制（默认 5000）
         paragraph_limit: Markdown 段落数限制（默认 20）
+        max_budget_tokens: 段落摘要阶段的估算输入 token 上限（None 表示不限制）
+        mode: 段落摘要的调用方式，"batch" 通过 Batch 接口提交
+        max_concurrency: sync 模式下同时进行的段落摘要请求数
     """
     print(f"正在读取文件: {input_path}")
 
@@ -268,8 +348,7 @@ def process_summary(
         print(f"共生成 {len(segments)} 个段落")
     elif file_format == "markdown":
         # Markdown 文件使用智能分段
-        with open(input_path, 'r', encoding='utf-8') as f:
-            original_text = f.read()
+        original_text = read_text_mapped(input_path)
         print(f"原始文本长度: {len(original_text)} 字符")
         print(f"\n正在分段（字数限制: {char_limit}，段落数限制: {paragraph_limit}）...")
         format_type = "markdown"
@@ -277,8 +356,7 @@ def process_summary(
         print(f" 检测到格式: {format_type}")
         print(f" 共生成 {len(segments)} 个段落")
     else:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            original_text = f.read()
+        original_text = read_text_mapped(input_path)
 
         print(f"原始文本长度: {len(original_text)} 字符")
         print(f"\n正在分段（每段 {min_spaces}-{max_spaces} 个空格）...")
@@ -288,18 +366,22 @@ def process_summary(
             min_spaces,
             max_spaces,
             char_limit,
-            paragraph_limit
+            paragraph_limit,
+            format_type=file_format,
         )
         print(f" 检测到格式: {format_type}")
         print(f" 共生成 {len(segments)} 个段落")
 
+    # 分段结果在流式处理期间不再变化
+    segments = tuple(segments)
+
     # 计算输出路径
     input_path_obj = Path(input_path)
     segments_output = output_dir / f"{input_path_obj.stem}_segment_summaries.md"
     final_output = output_dir / f"{input_path_obj.stem}_final_summary.md"
 
     # 检查进度
-    start_index, start_status = load_progress(str(segments_output), len(segments))
+    start_index, start_status, start_offset = load_progress(str(segments_output), len(segments))
 
     if start_status == "complete":
         print("\n  摘要处理已完成！")
@@ -311,12 +393,18 @@ def process_summary(
         print(f"已处理: {start_index}/{len(segments)} 个段落")
         print(f"状态: {start_status}")
 
+    # 在写入输出文件前检查剩余段落的 token 预算，避免运行到中途才因额度不足失败
+    estimated_tokens = check_token_budget(segments[start_index:], summary_prompt, max_budget_tokens)
+    print(f"预计输入 token: 约 {estimated_tokens}")
+
     # 流式处理段落摘要
     print("\n" + "-" * 60)
     print("阶段 1: 处理各时段摘要（流式写入）")
     print("-" * 60)
 
-    content_transformer = create_content_transformer(format_type)
+    from streaming_processor import process_segments_streaming
+
+    content_transformer = create_content_transformer(format_type, segments)
     process_segments_streaming(
         client,
         summary_prompt,
@@ -325,6 +413,9 @@ def process_summary(
         start_index,
         start_status,
         content_transformer,
+        mode=mode,
+        max_concurrency=max_concurrency,
+        start_offset=start_offset,
     )
 
     # 生成最终摘要
@@ -336,48 +427,76 @@ def process_summary(
 
 # ============ CLI 参数解析 ============
 
-def parse_cli_args() -> tuple[str, int, int]:
+class _ArgumentParser(argparse.ArgumentParser):
+    """错误提示使用中文并以状态码 1 退出的参数解析器"""
+    def error(self, message: str) -> NoReturn:
+        self.print_usage()
+        print(f"错误: {message}")
+        sys.exit(1)
+
+
+def _build_parser() -> _ArgumentParser:
+    """构建命令行解析器"""
+    parser = _ArgumentParser(
+        prog='summary_processor.py',
+        description='直播文稿摘要处理程序',
+        epilog='示例: python summary_processor.py input.txt 50 60',
+    )
+    parser.add_argument('input_path', metavar='输入文件路径')
+    parser.add_argument(
+        'min_spaces', nargs='?', type=int, default=DEFAULT_MIN_SPACES, metavar='最小空格数',
+        help=f'每段最少空格数（默认 {DEFAULT_MIN_SPACES}）',
+    )
+    parser.add_argument(
+        'max_spaces', nargs='?', type=int, default=DEFAULT_MAX_SPACES, metavar='最大空格数',
+        help=f'每段最多空格数（默认 {DEFAULT_MAX_SPACES}）',
+    )
+    parser.add_argument(
+        '--batch', dest='mode', action='store_const', const='batch', default='sync',
+        help='通过 Batch 接口提交（成本低、延迟高，中断后重新运行会继续等待）',
+    )
+    parser.add_argument(
+        '--max-tokens', type=int, metavar='N',
+        help='预计输入 token 超过 N 时在调用 API 前中止（默认不限制）',
+    )
+    parser.add_argument(
+        '--concurrency', type=int, default=1, metavar='N',
+        help='同时进行的 API 请求数（默认 1；--batch 时不生效）。Ctrl-C 后需等进行中的请求结束才会退出',
+    )
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false', help='不读写本地响应缓存')
+    return parser
+
+
+def parse_cli_args() -> argparse.Namespace:
     """
     解析命令行参数
 
     返回:
-        (input_path, min_spaces, max_spaces)
+        命令行参数（input_path、min_spaces、max_spaces、mode、max_tokens、concurrency、use_cache）
     """
-    if len(sys.argv) < 2:
-        print("用法: python summary_processor.py <输入文件路径> [最小空格数] [最大空格数]")
-        print("示例: python summary_processor.py input.txt 50 60")
-        sys.exit(1)
+    parser = _build_parser()
+    args = parser.parse_intermixed_args()  # 选项可以出现在位置参数之间（与旧版手写解析一致）
 
-    input_path = sys.argv[1]
-    min_spaces = DEFAULT_MIN_SPACES
-    max_spaces = DEFAULT_MAX_SPACES
-
-    if len(sys.argv) >= 3:
-        try:
-            min_spaces = int(sys.argv[2])
-        except ValueError:
-            print(f"错误: 最小空格数必须是整数，得到 '{sys.argv[2]}'")
-            sys.exit(1)
-
-    if len(sys.argv) >= 4:
-        try:
-            max_spaces = int(sys.argv[3])
-        except ValueError:
-            print(f"错误: 最大空格数必须是整数，得到 '{sys.argv[3]}'")
-            sys.exit(1)
-
-    if min_spaces > max_spaces:
-        print(f"错误: 最小空格数 ({min_spaces}) 不能大于最大空格数 ({max_spaces})")
-        sys.exit(1)
+    if args.min_spaces > args.max_spaces:
+        parser.error(f"最小空格数 ({args.min_spaces}) 不能大于最大空格数 ({args.max_spaces})")
+    if args.max_tokens is not None and args.max_tokens <= 0:
+        parser.error(f"--max-tokens 必须是正整数，得到 {args.max_tokens}")
+
+    if args.concurrency < 1:
+        parser.error(f"--concurrency 必须是正整数，得到 {args.concurrency}")
 
-    return input_path, min_spaces, max_spaces
+    return args
 
 
 # ============ 主程序 ============
 
 def main() -> None:
     """主程序入口"""
-    input_path, min_spaces, max_spaces = parse_cli_args()
+    args = parse_cli_args()
+    input_path, min_spaces, max_spaces = args.input_path, args.min_spaces, args.max_spaces
+
+    # 参数检查通过后再导入 API 相关模块（openai 导入较慢，用法错误时无需加载）
+    from api_utils import create_client, set_response_cache_enabled, warm_up
 
     script_dir = Path(__file__).parent.parent
     config_dir = script_dir / "config"
@@ -403,13 +522,20 @@ def main() -> None:
         print(f"  合并提示词: 已加载 ({len(merge_prompt)} 字符)")
 
         print("\n正在初始化 DeepSeek 客户端...")
+        set_response_cache_enabled(args.use_cache)
         client = create_client(api_key)
+        warm_up(client)
         print("  客户端初始化成功")
 
         print("\n" + "-" * 60)
         print("开始处理摘要")
         print("-" * 60)
-        process_summary(input_path, output_dir, client, summary_prompt, merge_prompt, min_spaces, max_spaces)
+        process_summary(
+            input_path, output_dir, client, summary_prompt, merge_prompt, min_spaces, max_spaces,
+            mode=args.mode,
+            max_budget_tokens=args.max_tokens,
+            max_concurrency=args.concurrency,
+        )
 
         print("\n" + "=" * 60)
         print("摘要处理完成!")
@@ -4,21 +4,19 @@
 功能：去除时间戳、分段、调用 DeepSeek API 处理、输出 Markdown
 """
 
+import argparse
 import sys
 from pathlib import Path
-
-from openai import OpenAI
+from typing import NoReturn
 
 from preprocessor import (
-    remove_timestamps,
+    remove_timestamps_from_file,
     segment_by_spaces,
     detect_file_format,
     process_srt_plain,
 )
-from api_utils import create_client, call_deepseek_api
 from config_utils import initialize_project_setup, load_prompt
 from progress_utils import load_progress
-from streaming_processor import process_segments_streaming
 
 
 # ============ 配置常量 ============
@@ -64,12 +62,10 @@ def preprocess_file(input_path: str, min_spaces: int = DEFAULT_MIN_SPACES,
         print("\n检测到 SRT 字幕文件，提取纯文本...")
         cleaned_text = process_srt_plain(input_path)
     else:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            original_text = f.read()
-
-        print(f"原始文本长度: {len(original_text)} 字符")
+        # 分块读取并去除时间戳，不在内存中同时保留原文和清理结果
         print("\n正在去除时间戳...")
-        cleaned_text = remove_timestamps(original_text)
+        cleaned_text, original_length = remove_timestamps_from_file(input_path)
+        print(f"原始文本长度: {original_length} 字符")
 
     print(f"处理后文本长度: {len(cleaned_text)} 字符")
     print(f"\n正在分段（每段 {min_spaces}-{max_spaces} 个空格）...")
@@ -80,48 +76,71 @@ def preprocess_file(input_path: str, min_spaces: int = DEFAULT_MIN_SPACES,
 
 # ============ CLI 参数解析 ============
 
-def parse_cli_args() -> tuple[str, int, int]:
+class _ArgumentParser(argparse.ArgumentParser):
+    """错误提示使用中文并以状态码 1 退出的参数解析器"""
+    def error(self, message: str) -> NoReturn:
+        self.print_usage()
+        print(f"错误: {message}")
+        sys.exit(1)
+
+
+def _build_parser() -> _ArgumentParser:
+    """构建命令行解析器"""
+    parser = _ArgumentParser(
+        prog='transcript_processor.py',
+        description='直播文稿处理程序',
+        epilog='示例: python transcript_processor.py input.txt 50 60',
+    )
+    parser.add_argument('input_path', metavar='输入文件路径')
+    parser.add_argument(
+        'min_spaces', nargs='?', type=int, default=DEFAULT_MIN_SPACES, metavar='最小空格数',
+        help=f'每段最少空格数（默认 {DEFAULT_MIN_SPACES}）',
+    )
+    parser.add_argument(
+        'max_spaces', nargs='?', type=int, default=DEFAULT_MAX_SPACES, metavar='最大空格数',
+        help=f'每段最多空格数（默认 {DEFAULT_MAX_SPACES}）',
+    )
+    parser.add_argument(
+        '--batch', dest='mode', action='store_const', const='batch', default='sync',
+        help='通过 Batch 接口提交（成本低、延迟高，中断后重新运行会继续等待）',
+    )
+    parser.add_argument(
+        '--concurrency', type=int, default=1, metavar='N',
+        help='同时进行的 API 请求数（默认 1；--batch 时不生效）。Ctrl-C 后需等进行中的请求结束才会退出',
+    )
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false', help='不读写本地响应缓存')
+    return parser
+
+
+def parse_cli_args() -> argparse.Namespace:
     """
     解析命令行参数
 
     返回:
-        (input_path, min_spaces, max_spaces)
+        命令行参数（input_path、min_spaces、max_spaces、mode、concurrency、use_cache）
     """
-    if len(sys.argv) < 2:
-        print("用法: python transcript_processor.py <输入文件路径> [最小空格数] [最大空格数]")
-        print("示例: python transcript_processor.py input.txt 50 60")
-        sys.exit(1)
+    parser = _build_parser()
+    args = parser.parse_intermixed_args()  # 选项可以出现在位置参数之间（与旧版手写解析一致）
 
-    input_path = sys.argv[1]
-    min_spaces = DEFAULT_MIN_SPACES
-    max_spaces = DEFAULT_MAX_SPACES
-
-    if len(sys.argv) >= 3:
-        try:
-            min_spaces = int(sys.argv[2])
-        except ValueError:
-            print(f"错误: 最小空格数必须是整数，得到 '{sys.argv[2]}'")
-            sys.exit(1)
-
-    if len(sys.argv) >= 4:
-        try:
-            max_spaces = int(sys.argv[3])
-        except ValueError:
-            print(f"错误: 最大空格数必须是整数，得到 '{sys.argv[3]}'")
-            sys.exit(1)
-
-    if min_spaces > max_spaces:
-        print(f"错误: 最小空格数 ({min_spaces}) 不能大于最大空格数 ({max_spaces})")
-        sys.exit(1)
+    if args.min_spaces > args.max_spaces:
+        parser.error(f"最小空格数 ({args.min_spaces}) 不能大于最大空格数 ({args.max_spaces})")
 
-    return input_path, min_spaces, max_spaces
+    if args.concurrency < 1:
+        parser.error(f"--concurrency 必须是正整数，得到 {args.concurrency}")
+
+    return args
 
 
 # ============ 主程序 ============
 
 def main() -> None:
     """主程序入口"""
-    input_path, min_spaces, max_spaces = parse_cli_args()
+    args = parse_cli_args()
+    input_path, min_spaces, max_spaces = args.input_path, args.min_spaces, args.max_spaces
+
+    # 参数检查通过后再导入 API 相关模块（openai 导入较慢，用法错误时无需加载）
+    from api_utils import create_client, set_response_cache_enabled, warm_up
+    from streaming_processor import process_segments_streaming
 
     script_dir = Path(__file__).parent.parent
     config_dir = script_dir / "config"
@@ -144,7 +163,9 @@ def main() -> None:
         print(f"  提示词: 已加载 ({len(system_prompt)} 字符)")
 
         print("\n正在初始化 DeepSeek 客户端...")
+        set_response_cache_enabled(args.use_cache)
         client = create_client(api_key)
+        warm_up(client)
         print("  客户端初始化成功")
 
         print("\n" + "-" * 60)
@@ -156,7 +177,7 @@ def main() -> None:
         input_path_obj = Path(input_path)
         output_path = output_dir / f"{input_path_obj.stem}_processed.md"
 
-        start_index, start_status = load_progress(str(output_path), len(segments))
+        start_index, start_status, start_offset = load_progress(str(output_path), len(segments))
 
         if start_status == "complete":
             print("\n  文件已处理完成！")
@@ -171,7 +192,8 @@ def main() -> None:
         print("\n" + "-" * 60)
         print("阶段 2: API 处理（流式写入）")
         print("-" * 60)
-        process_segments_streaming(client, system_prompt, segments, str(output_path), start_index, start_status)
+        process_segments_streaming(client, system_prompt, segments, str(output_path), start_index, start_status,
+                                   mode=args.mode, max_concurrency=args.concurrency, start_offset=start_offset)
         print(f"\n结果已保存到: {output_path}")
 
         print("\n" + "=" * 60)